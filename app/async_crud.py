@@ -0,0 +1,119 @@
+"""
+AsyncSession counterparts of the crud functions behind the async routes.
+
+Reads are plain awaited SELECTs. Writes run the sync crud function on the
+AsyncSession's own Session through ``run_sync``, so search indexing and
+counter bookkeeping stay in one place while the I/O still goes through
+the async driver. Functions not listed here are only available sync.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+
+
+# ---------- TASKS ----------
+
+async def get_task(db: AsyncSession, task_id: int):
+    """Return a single task by id, or None."""
+    return await db.scalar(crud.TASK_BY_ID, {"task_id": task_id})
+
+
+async def get_task_detail(db: AsyncSession, task_id: int, expand: set[str] = frozenset()):
+    return await db.run_sync(crud.get_task_detail, task_id, expand)
+
+
+async def list_tasks(
+    db: AsyncSession,
+    status: str | None = None,
+    assigned_to: str | None = None,
+    q: str | None = None,
+    limit: int = 50,
+    offset: int = 0,
+    sort_by: str = "id",
+    order: str = "asc",
+    cursor: str | None = None,
+):
+    """See crud.list_tasks. Raises ValueError for a bad cursor."""
+    # building the statement touches no I/O, so the sync builder is reused as is
+    stmt, params = crud.tasks_statement(
+        db.sync_session,
+        status=status,
+        assigned_to=assigned_to,
+        q=q,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        paged=True,
+    )
+    params.update(limit=limit, offset=0 if cursor else offset)
+    result = await db.scalars(stmt, params)
+    return result.all()
+
+
+async def create_task(db: AsyncSession, data: schemas.TaskCreate):
+    return await db.run_sync(crud.create_task, data)
+
+
+async def update_task(db: AsyncSession, task_id: int, data: schemas.TaskUpdate):
+    return await db.run_sync(crud.update_task, task_id, data)
+
+
+async def delete_task(db: AsyncSession, task_id: int) -> bool:
+    return await db.run_sync(crud.delete_task, task_id)
+
+
+# ---------- COMMENTS ----------
+
+async def get_comments_for_task(db: AsyncSession, task_id: int):
+    result = await db.scalars(
+        select(models.Comment)
+        .where(models.Comment.task_id == task_id)
+        .order_by(models.Comment.created_at.asc())
+    )
+    return result.all()
+
+
+async def create_comment_for_task(
+    db: AsyncSession, task_id: int, comment_in: schemas.CommentCreate
+):
+    return await db.run_sync(crud.create_comment_for_task, task_id, comment_in)
+
+
+# ---------- ATTACHMENTS ----------
+
+async def get_attachments_for_task(db: AsyncSession, task_id: int):
+    result = await db.scalars(
+        select(models.Attachment)
+        .where(models.Attachment.task_id == task_id)
+        .order_by(models.Attachment.uploaded_at.asc())
+    )
+    return result.all()
+
+
+async def get_attachment(db: AsyncSession, attachment_id: int):
+    return await db.scalar(crud.ATTACHMENT_BY_ID, {"attachment_id": attachment_id})
+
+
+async def add_attachment(
+    db: AsyncSession, task_id: int, filename: str, sha256: str, size: int, content_type: str
+):
+    return await db.run_sync(crud.add_attachment, task_id, filename, sha256, size, content_type)
+
+
+async def delete_attachment(db: AsyncSession, attachment_id: int) -> bool:
+    return await db.run_sync(crud.delete_attachment, attachment_id)
+
+
+# ---------- USERS ----------
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(crud.USER_BY_USERNAME, {"username": username})
+
+
+async def create_user(db: AsyncSession, user_in: schemas.UserCreate, hashed_password: str):
+    return await db.run_sync(crud.create_user, user_in, hashed_password)
+
+
+async def set_user_password_hash(db: AsyncSession, user: models.User, hashed_password: str):
+    await db.run_sync(crud.set_user_password_hash, user, hashed_password)
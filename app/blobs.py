@@ -0,0 +1,218 @@
+"""
+Content-addressed attachment storage.
+
+Each distinct file is stored once, under the key ``blobs/<2 hex>/<sha256>``
+in the configured storage backend (app/storage.py), and has a row in the
+``blobs`` table counting the attachments that point at it.
+Attachment.filepath holds that key, so downloads work the same for every
+attachment.
+
+Ordering keeps files and counts safe against a concurrent GC: an upload
+takes its reference (``acquire``) and commits before putting its file in
+storage (``store``), and ``collect_garbage`` deletes a blob's file inside
+the transaction that deletes its still-unreferenced row. A second upload
+of the same content just stores an identical file over the first (or
+skips it where the backend can tell). ``release`` is called by crud
+whenever attachments are deleted. Image previews (app/thumbnails.py) are
+kept while their blob is and deleted with it.
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models, thumbnails, uploads
+from .storage import Storage
+
+BLOB_DIR = "blobs"
+# the only storage areas GC sweeps for unreferenced files; anything else
+# under UPLOAD_DIR or in the bucket is not ours to delete
+_SWEPT = (f"{BLOB_DIR}/", f"{thumbnails.THUMB_DIR}/")
+
+_blobs = models.Blob.__table__
+_RELEASE = (
+    update(_blobs)
+    .where(_blobs.c.sha256 == bindparam("sha"))
+    .values(refcount=_blobs.c.refcount - bindparam("n"), updated_at=bindparam("now"))
+)
+
+
+def relative_path(sha256: str) -> str:
+    """Storage key of a blob's file (its path under UPLOAD_DIR when local)."""
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256}"
+
+
+def store(storage: Storage, tmp_path: str, sha256: str):
+    """Put a finished upload into storage as the file for `sha256` (blocking)."""
+    storage.put(tmp_path, relative_path(sha256))
+
+
+def acquire(db, sha256: str, size: int, count: int = 1):
+    """
+    Count `count` more references to a blob, creating its row. Takes a
+    Session or a Connection (migrations). Caller commits.
+    """
+    bind = db.get_bind() if isinstance(db, Session) else db
+    insert = postgresql_insert if bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(_blobs).values(
+        sha256=sha256, size=size, refcount=count, updated_at=datetime.now(timezone.utc)
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={
+            "refcount": stmt.table.c.refcount + stmt.excluded.refcount,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+def release(db: Session, attachment_filter):
+    """
+    Drop the references held by the attachments matching `attachment_filter`
+    (a WHERE clause on models.Attachment), before they are deleted. Caller
+    commits.
+    """
+    counts = db.execute(
+        select(models.Attachment.sha256, func.count())
+        .where(attachment_filter, models.Attachment.sha256.isnot(None))
+        .group_by(models.Attachment.sha256)
+    ).all()
+    if counts:
+        now = datetime.now(timezone.utc)
+        db.execute(_RELEASE, [{"sha": sha, "n": n, "now": now} for sha, n in counts])
+
+
+def copy_all(
+    db: Session, source: Storage, target: Storage, staging_dir: str, batch_size: int = 500
+) -> tuple[int, int]:
+    """
+    Copy the file of every blob that `target` lacks from `source`, e.g. from
+    UPLOAD_DIR into a bucket before switching STORAGE_BACKEND. Each file is
+    staged in `staging_dir` on the way. Returns (files copied, files missing
+    from both).
+    """
+    copied = missing = 0
+    last = ""
+    while True:
+        shas = db.scalars(
+            select(models.Blob.sha256)
+            .where(models.Blob.sha256 > last)
+            .order_by(models.Blob.sha256)
+            .limit(batch_size)
+        ).all()
+        # no transaction held open across the uploads
+        db.rollback()
+        if not shas:
+            return copied, missing
+        for sha in shas:
+            key = relative_path(sha)
+            if target.exists(key):
+                continue
+            if not source.exists(key):
+                missing += 1
+                continue
+            fd, tmp = tempfile.mkstemp(dir=staging_dir, prefix=uploads.TEMP_PREFIX)
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    for chunk in source.iter_chunks(key):
+                        out.write(chunk)
+                target.put(tmp, key)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            copied += 1
+        last = shas[-1]
+
+
+def purge_originals(
+    db: Session, storage: Storage, upload_dir: str, dry_run: bool = False
+) -> tuple[int, int]:
+    """
+    Delete the files uploads kept directly in `upload_dir` before the blob
+    store (migration 0006 links them into it but leaves them in place),
+    each once no attachment points at it and `storage` holds a blob with
+    the same content. Returns (files removed, bytes freed).
+    """
+    removed = freed = 0
+    for entry in os.scandir(upload_dir):
+        if not entry.is_file(follow_symlinks=False) or entry.name.startswith(uploads.TEMP_PREFIX):
+            continue
+        in_use = db.scalar(
+            select(models.Attachment.id).where(models.Attachment.filepath == entry.name).limit(1)
+        )
+        if in_use is not None:
+            continue
+        sha, size, _ = uploads.describe_file(entry.path, entry.name)
+        if db.get(models.Blob, sha) is None or not storage.exists(relative_path(sha)):
+            continue
+        if not dry_run:
+            os.unlink(entry.path)
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def collect_garbage(
+    db: Session, storage: Storage, staging_dir: str, grace_seconds: int
+) -> tuple[int, int]:
+    """
+    Remove blobs nobody has referenced for `grace_seconds`, then files
+    under blobs/ and thumbs/ that no blob accounts for (previews of removed
+    blobs, files stored by an upload that then failed) and stale upload
+    temp files in `staging_dir` once they are that old. Nothing else in
+    storage is touched. Returns (files removed, bytes freed).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    removed = freed = 0
+
+    candidates = db.execute(
+        select(models.Blob.sha256, models.Blob.size).where(
+            models.Blob.refcount <= 0, models.Blob.updated_at < cutoff
+        )
+    ).all()
+    for sha, size in candidates:
+        # re-checked under the delete, so a blob re-acquired since the
+        # SELECT keeps its row and its file
+        gone = db.execute(
+            delete(models.Blob).where(models.Blob.sha256 == sha, models.Blob.refcount <= 0)
+        ).rowcount
+        if gone:
+            storage.delete(relative_path(sha))
+            for key in thumbnails.keys(sha):
+                storage.delete(key)
+            freed += size
+            removed += 1
+        db.commit()
+
+    referenced = set(db.scalars(select(models.Attachment.filepath)))
+    shas = set(db.scalars(select(models.Blob.sha256)))
+    known = {relative_path(sha) for sha in shas}
+    oldest = time.time() - grace_seconds
+    for area in _SWEPT:
+        for key, size, modified in storage.list(area):
+            if modified >= oldest or key in referenced or key in known:
+                continue
+            if thumbnails.source_sha(key) in shas:
+                continue
+            storage.delete(key)
+            freed += size
+            removed += 1
+
+    for entry in os.scandir(staging_dir):
+        if not entry.name.startswith(uploads.TEMP_PREFIX):
+            continue
+        try:
+            stat = entry.stat()
+            if stat.st_mtime < oldest:
+                os.unlink(entry.path)
+                freed += stat.st_size
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed, freed
@@ -0,0 +1,205 @@
+"""
+Maintenance commands for the task board.
+
+    python -m app.cli migrate
+    python -m app.cli reindex-search [--batch-size N]
+    python -m app.cli explain-queries [--verbose]
+    python -m app.cli rebuild-counters
+    python -m app.cli calibrate-hash [--target-ms 250]
+    python -m app.cli purge-revoked-tokens
+    python -m app.cli profile-startup [--top 15] [--target-ms N]
+    python -m app.cli gc-blobs [--grace-seconds N]
+    python -m app.cli copy-blobs-to-storage [--from-dir DIR]
+    python -m app.cli purge-pre-blob-files [--dry-run]
+"""
+import argparse
+import subprocess
+import sys
+
+from . import (
+    blobs, crud, index_advisor, migrations, passwords, revocation, search, startup_profile,
+    storage,
+)
+from .database import SessionLocal, engine, settings
+
+
+def migrate(args):
+    applied = migrations.upgrade(engine)
+    for name in applied:
+        print(f"Applied {name}")
+    if not applied:
+        print("Schema is up to date")
+
+
+def reindex_search(args):
+    migrations.check(engine)
+    db = SessionLocal()
+    try:
+        total = search.reindex(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Indexed {total} tasks")
+
+
+def explain_queries(args):
+    db = SessionLocal()
+    try:
+        missing = index_advisor.print_report(index_advisor.advise(db), verbose=args.verbose)
+    finally:
+        db.close()
+    if missing:
+        sys.exit(1)
+
+
+def rebuild_counters(args):
+    db = SessionLocal()
+    try:
+        rows = crud.rebuild_task_counters(db)
+    finally:
+        db.close()
+    print(f"Wrote {rows} counter rows")
+
+
+def calibrate_hash(args):
+    rounds, measured = passwords.calibrate(args.target_ms)
+    print(f"{rounds} rounds verify in {measured:.0f} ms on this machine")
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+def purge_revoked_tokens(args):
+    db = SessionLocal()
+    try:
+        removed = revocation.purge_expired(db)
+    finally:
+        db.close()
+    print(f"Removed {removed} expired revocations")
+
+
+def gc_blobs(args):
+    if settings.STORAGE_BACKEND == "s3" and not settings.S3_PREFIX:
+        # without a prefix of its own the bucket may hold other data
+        print("gc-blobs needs S3_PREFIX set when STORAGE_BACKEND=s3", file=sys.stderr)
+        sys.exit(1)
+    migrations.check(engine)
+    db = SessionLocal()
+    try:
+        removed, freed = blobs.collect_garbage(
+            db, storage.get_storage(), settings.UPLOAD_DIR, args.grace_seconds
+        )
+    finally:
+        db.close()
+    print(f"Removed {removed} unreferenced files ({freed / 1024 / 1024:.1f} MB)")
+
+
+def copy_blobs_to_storage(args):
+    if settings.STORAGE_BACKEND == "local":
+        print("copy-blobs-to-storage copies into the STORAGE_BACKEND=s3 bucket; "
+              "run it with the S3 settings in place", file=sys.stderr)
+        sys.exit(1)
+    migrations.check(engine)
+    db = SessionLocal()
+    try:
+        copied, missing = blobs.copy_all(
+            db, storage.LocalStorage(args.from_dir), storage.get_storage(), settings.UPLOAD_DIR
+        )
+    finally:
+        db.close()
+    print(f"Copied {copied} files ({missing} missing from {args.from_dir})")
+
+
+def purge_pre_blob_files(args):
+    migrations.check(engine)
+    db = SessionLocal()
+    try:
+        removed, freed = blobs.purge_originals(
+            db, storage.get_storage(), settings.UPLOAD_DIR, dry_run=args.dry_run
+        )
+    finally:
+        db.close()
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {removed} pre-blob files ({freed / 1024 / 1024:.1f} MB)")
+
+
+def profile_startup(args):
+    try:
+        report, importtime = startup_profile.profile()
+    except subprocess.CalledProcessError as exc:
+        print(exc.stderr, file=sys.stderr)
+        sys.exit(exc.returncode)
+
+    rows = startup_profile.parse_importtime(importtime)
+    print(f"Slowest imports (cumulative, of {len(rows)}):")
+    for name, _, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print("Self time by top-level package:")
+    for package, self_us in startup_profile.top_level_packages(rows)[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+    print("Boot phases:")
+    for phase, ms in report["phases_ms"].items():
+        print(f"  {ms:8.1f} ms  {phase}")
+    print(f"  {report['total_ms']:8.1f} ms  total (target {args.target_ms} ms)")
+
+    failed = False
+    if report["eager_auth_modules"]:
+        print(f"Imported before first use: {', '.join(report['eager_auth_modules'])}")
+        failed = True
+    if report["total_ms"] > args.target_ms:
+        print("Boot is over target")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="apply schema migrations")
+    p.set_defaults(func=migrate)
+
+    p = sub.add_parser("reindex-search", help="rewrite the full-text search row of every task")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.set_defaults(func=reindex_search)
+
+    p = sub.add_parser("explain-queries", help="report list_tasks shapes that miss an index")
+    p.add_argument("--verbose", action="store_true", help="print every plan")
+    p.set_defaults(func=explain_queries)
+
+    p = sub.add_parser("rebuild-counters", help="recompute the /tasks/stats counter table")
+    p.set_defaults(func=rebuild_counters)
+
+    p = sub.add_parser("calibrate-hash", help="pick password hash rounds for a verify time")
+    p.add_argument("--target-ms", type=float, default=250)
+    p.set_defaults(func=calibrate_hash)
+
+    p = sub.add_parser("purge-revoked-tokens", help="drop revocations of already expired tokens")
+    p.set_defaults(func=purge_revoked_tokens)
+
+    p = sub.add_parser("profile-startup", help="time worker boot and its slowest imports")
+    p.add_argument("--top", type=int, default=15)
+    p.add_argument("--target-ms", type=float, default=startup_profile.TARGET_MS)
+    p.set_defaults(func=profile_startup)
+
+    p = sub.add_parser("gc-blobs", help="delete attachment files nothing references any more")
+    p.add_argument("--grace-seconds", type=int, default=settings.BLOB_GC_GRACE_SECONDS)
+    p.set_defaults(func=gc_blobs)
+
+    p = sub.add_parser(
+        "copy-blobs-to-storage", help="copy local attachment files into the configured bucket"
+    )
+    p.add_argument("--from-dir", default=settings.UPLOAD_DIR, help="local UPLOAD_DIR to copy from")
+    p.set_defaults(func=copy_blobs_to_storage)
+
+    p = sub.add_parser(
+        "purge-pre-blob-files",
+        help="delete attachment files from before the blob store once their blob holds them",
+    )
+    p.add_argument("--dry-run", action="store_true", help="only count what would be removed")
+    p.set_defaults(func=purge_pre_blob_files)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
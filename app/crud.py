@@ -1,20 +1,55 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+from types import SimpleNamespace
 
-from . import models, schemas
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import (
+    Date, and_, asc, bindparam, delete, desc, false, func, insert, or_, select, tuple_
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import blobs, models, schemas, search
+from .database import settings
+from .pagination import decode_cursor, encode_cursor
+
+
+# Hot lookups are built once with bound parameters and reused: executing a
+# prebuilt statement skips constructing it and regenerating its cache key,
+# which is most of the ORM's per-call overhead for a one-row SELECT.
+TASK_BY_ID = select(models.Task).where(models.Task.id == bindparam("task_id"))
+ATTACHMENT_BY_ID = select(models.Attachment).where(
+    models.Attachment.id == bindparam("attachment_id")
+)
+USER_BY_USERNAME = select(models.User).where(models.User.username == bindparam("username"))
 
 
 # ---------- TASKS ----------
 
 def get_task(db: Session, task_id: int):
     """Return a single task by id, or None."""
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+    return db.scalars(TASK_BY_ID, {"task_id": task_id}).first()
+
+
+def get_task_detail(db: Session, task_id: int, expand: set[str] = frozenset()):
+    """
+    Return a task with the relationships named in `expand` ("comments",
+    "attachments") loaded up front, one SELECT ... IN per relationship.
+    """
+    query = db.query(models.Task).filter(models.Task.id == task_id)
+    for name in expand:
+        query = query.options(selectinload(getattr(models.Task, name)))
+    return query.first()
 
 
 def create_task(db: Session, data: schemas.TaskCreate):
     """Insert a new task."""
     row = models.Task(**data.model_dump())
     db.add(row)
+    db.flush()
+    search.index_task(db, row)
+    _track_counters(db, None, row)
     db.commit()
     db.refresh(row)
     return row
@@ -22,13 +57,16 @@ def create_task(db: Session, data: schemas.TaskCreate):
 
 def update_task(db: Session, task_id: int, data: schemas.TaskUpdate):
     """Patch/Update an existing task."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = get_task(db, task_id)
     if not task:
         return None
 
+    before = _counter_keys(task)
     for k, v in data.model_dump(exclude_unset=True).items():
         setattr(task, k, v)
 
+    search.index_task(db, task)
+    _track_counters(db, before, task)
     db.commit()
     db.refresh(task)
     return task
@@ -36,15 +74,237 @@ def update_task(db: Session, task_id: int, data: schemas.TaskUpdate):
 
 def delete_task(db: Session, task_id: int) -> bool:
     """Delete task by id. Return True if deleted, False if not found."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = get_task(db, task_id)
     if not task:
         return False
 
+    search.remove_task(db, task_id)
+    blobs.release(db, models.Attachment.task_id == task_id)
+    _track_counters(db, _counter_keys(task), None)
     db.delete(task)
     db.commit()
     return True
 
 
+# ---------- TASK BATCHES ----------
+
+def create_tasks(db: Session, items: list[schemas.TaskCreate]) -> list[models.Task]:
+    """
+    Insert many tasks in one transaction with a single executemany
+    INSERT ... RETURNING, keeping the search index and counters in step.
+    """
+    if not items:
+        return []
+
+    # ids follow insertion order; asking RETURNING for parameter order
+    # instead makes SQLite fall back to one INSERT per row
+    rows = db.scalars(
+        insert(models.Task).returning(models.Task),
+        [item.model_dump() for item in items],
+    ).all()
+    rows.sort(key=lambda t: t.id)
+    search.index_tasks(db, rows, with_comments=False)
+    _apply_counter_changes(db, [(None, _counter_keys(t)) for t in rows])
+    return _commit_detached(db, rows)
+
+
+def update_tasks(db: Session, items: list[schemas.TaskBatchUpdate]):
+    """
+    Patch many tasks in one transaction. Returns (updated tasks, missing ids).
+    """
+    ids = {item.id for item in items}
+    tasks = {t.id: t for t in db.query(models.Task).filter(models.Task.id.in_(ids))}
+
+    changes = []
+    missing = []
+    for item in items:
+        task = tasks.get(item.id)
+        if task is None:
+            missing.append(item.id)
+            continue
+        before = _counter_keys(task)
+        for k, v in item.model_dump(exclude_unset=True, exclude={"id"}).items():
+            setattr(task, k, v)
+        changes.append((before, _counter_keys(task)))
+
+    touched = list(tasks.values())
+    db.flush()
+    search.index_tasks(db, touched)
+    _apply_counter_changes(db, changes)
+    _commit_detached(db, touched)
+    return [tasks[item.id] for item in items if item.id in tasks], missing
+
+
+def delete_tasks(db: Session, task_ids: list[int]) -> list[int]:
+    """Delete many tasks (and their children) in one transaction. Returns deleted ids."""
+    rows = (
+        db.query(models.Task.id, models.Task.status, models.Task.priority, models.Task.assigned_to)
+        .filter(models.Task.id.in_(set(task_ids)))
+        .all()
+    )
+    found = [row.id for row in rows]
+    if not found:
+        return []
+
+    db.execute(delete(models.Comment).where(models.Comment.task_id.in_(found)))
+    blobs.release(db, models.Attachment.task_id.in_(found))
+    db.execute(delete(models.Attachment).where(models.Attachment.task_id.in_(found)))
+    search.remove_tasks(db, found)
+    _apply_counter_changes(db, [(_counter_keys(row), None) for row in rows])
+    db.execute(delete(models.Task).where(models.Task.id.in_(found)))
+    db.commit()
+    return found
+
+
+def _commit_detached(db: Session, rows: list):
+    """
+    Commit and hand back rows detached from the session, so reading them
+    afterwards doesn't expire-and-reload every row one SELECT at a time.
+    """
+    for row in rows:
+        db.expunge(row)
+    db.commit()
+    return rows
+
+
+TASK_SORT_COLUMNS = {
+    "id": models.Task.id,
+    "task_name": models.Task.task_name,
+    "status": models.Task.status_rank,
+    "start_date": models.Task.start_date,
+    "end_date": models.Task.end_date,
+    "priority": models.Task.priority_rank,
+}
+
+
+def _sort_key(sort_by: str, order: str):
+    """Resolve sort_by/order into (normalized name, column, descending)."""
+    if sort_by not in TASK_SORT_COLUMNS:
+        sort_by = "id"
+    return sort_by, TASK_SORT_COLUMNS[sort_by], order.lower() == "desc"
+
+
+def _nulls_largest(db: Session) -> bool:
+    """Whether the dialect sorts NULL after every value (Postgres) or before (SQLite)."""
+    return db.get_bind().dialect.name != "sqlite"
+
+
+def _after_cursor(col, descending: bool, value, last_id: int, nulls_largest: bool):
+    """
+    Keyset predicate for rows that come after (value, last_id).
+    NULLs are placed where the dialect puts them natively, so a plain
+    (col, id) index can serve the ORDER BY in either direction.
+    """
+    id_col = models.Task.id
+    id_after = id_col < last_id if descending else id_col > last_id
+
+    if col is id_col:
+        return id_after
+
+    nulls_at_end = nulls_largest != descending
+
+    if value is None:
+        if nulls_at_end:
+            return and_(col.is_(None), id_after)
+        return or_(col.isnot(None), and_(col.is_(None), id_after))
+
+    # the value must be the kind the sort column holds (dates travel as ISO strings)
+    expected = str if isinstance(col.type, Date) else col.type.python_type
+    if type(value) is not expected:
+        raise ValueError("Invalid cursor")
+    if isinstance(col.type, Date):
+        value = date.fromisoformat(value)
+
+    # row-value comparison so the (col, id) index can seek straight to the cursor
+    key, bound = tuple_(col, id_col), tuple_(value, last_id)
+    clause = key < bound if descending else key > bound
+    if col.nullable and nulls_at_end:
+        clause = or_(clause, col.is_(None))
+    return clause
+
+
+def task_cursor(task: models.Task, sort_by: str = "id", order: str = "asc") -> str:
+    """Cursor pointing just past `task` for the given sort."""
+    sort_by, col, _ = _sort_key(sort_by, order)
+    return encode_cursor(sort_by, order.lower(), getattr(task, col.key), task.id)
+
+
+@lru_cache(maxsize=None)
+def _tasks_shape(by_status: bool, by_assignee: bool, sort_by: str, descending: bool, paged: bool):
+    """
+    The task list SELECT for one combination of filters and sort, with
+    every value left as a bound parameter. There are only a few dozen
+    shapes, so each is built once and reused like the lookups above.
+    """
+    stmt = select(models.Task)
+    if by_status:
+        stmt = stmt.where(models.Task.status == bindparam("status"))
+    if by_assignee:
+        stmt = stmt.where(models.Task.assigned_to == bindparam("assigned_to"))
+
+    col = TASK_SORT_COLUMNS[sort_by]
+    direction = desc if descending else asc
+    if col is models.Task.id:
+        stmt = stmt.order_by(direction(col))
+    else:
+        stmt = stmt.order_by(direction(col), direction(models.Task.id))
+
+    if paged:
+        stmt = stmt.limit(bindparam("limit")).offset(bindparam("offset"))
+    return stmt
+
+
+def tasks_statement(
+    db: Session,
+    status: str | None = None,
+    assigned_to: str | None = None,
+    q: str | None = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    cursor: str | None = None,
+    paged: bool = False,
+):
+    """
+    (statement, params) for the filtered + ordered task list. With `paged`
+    the statement also takes "limit" and "offset" params, left for the
+    caller to fill in. Search and cursor predicates depend on the values,
+    so they are added per call on top of the shared shape.
+    Raises ValueError for a malformed cursor or one from a different sort.
+    """
+    sort_by, col, descending = _sort_key(sort_by, order)
+    stmt = _tasks_shape(bool(status), bool(assigned_to), sort_by, descending, paged)
+
+    params = {}
+    if status:
+        params["status"] = status
+    if assigned_to:
+        params["assigned_to"] = assigned_to
+
+    if q:
+        # q with nothing searchable in it (e.g. "!!!") matches no task
+        match = search.match_clause(db, q)
+        stmt = stmt.where(match if match is not None else false())
+
+    if cursor:
+        data = decode_cursor(cursor)
+        if data.get("s") != sort_by or data.get("o") != order.lower():
+            raise ValueError("Cursor does not match sort_by/order")
+        stmt = stmt.where(
+            _after_cursor(col, descending, data.get("v"), data["id"], _nulls_largest(db))
+        )
+    return stmt, params
+
+
+def tasks_query(db: Session, **filters):
+    """
+    The list_tasks SELECT (no paging) with its values bound in, for
+    callers that post-process the statement (export, index advisor).
+    Raises ValueError for a malformed cursor or one from a different sort.
+    """
+    stmt, params = tasks_statement(db, **filters)
+    return stmt.params(params)
+
+
 def list_tasks(
     db: Session,
     status: str | None = None,
@@ -54,33 +314,154 @@ def list_tasks(
     offset: int = 0,
     sort_by: str = "id",
     order: str = "asc",
+    cursor: str | None = None,
 ):
-    """List tasks with optional filters + sorting + pagination."""
-    query = db.query(models.Task)
+    """
+    List tasks with optional filters + sorting + pagination.
+    When `cursor` is given it takes precedence over `offset` (keyset paging).
+    Raises ValueError for a malformed cursor or one from a different sort.
+    """
+    stmt, params = tasks_statement(
+        db,
+        status=status,
+        assigned_to=assigned_to,
+        q=q,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        paged=True,
+    )
+    params.update(limit=limit, offset=0 if cursor else offset)
+    return db.scalars(stmt, params).all()
 
-    if status:
-        query = query.filter(models.Task.status == status)
 
-    if assigned_to:
-        query = query.filter(models.Task.assigned_to == assigned_to)
+# ---------- TASK STATS ----------
 
-    if q:
-        like = f"%{q.lower()}%"
-        query = query.filter(models.Task.task_name.ilike(like))
-
-    sort_map = {
-        "id": models.Task.id,
-        "task_name": models.Task.task_name,
-        "status": models.Task.status,
-        "start_date": models.Task.start_date,
-        "end_date": models.Task.end_date,
-        "priority": models.Task.priority,
-    }
+_COUNTER_DIMENSIONS = ("status", "priority", "assigned_to")
+
+
+def _plain(value) -> str:
+    """Enum members and None to the string stored in task_counters."""
+    if value is None:
+        return ""
+    return getattr(value, "value", value)
 
-    col = sort_map.get(sort_by, models.Task.id)
-    direction = asc if order.lower() != "desc" else desc
 
-    return query.order_by(direction(col)).offset(offset).limit(limit).all()
+def _counter_keys(task: models.Task) -> set[tuple[str, str]]:
+    keys = {("total", "")}
+    keys.update((dim, _plain(getattr(task, dim))) for dim in _COUNTER_DIMENSIONS)
+    return keys
+
+
+def _track_counters(db: Session, before: set | None, task: models.Task | None):
+    """Apply the counter deltas of a task write. No-op unless counters are on."""
+    _apply_counter_changes(db, [(before, _counter_keys(task) if task is not None else None)])
+
+
+def _apply_counter_changes(db: Session, changes):
+    """
+    Apply counter deltas for [(keys before, keys after), ...], one upsert
+    per touched counter. None stands for "no row" (insert / delete).
+    """
+    if not settings.TASK_STATS_COUNTERS:
+        return
+
+    deltas = Counter()
+    for before, after in changes:
+        before, after = before or set(), after or set()
+        deltas.update({key: -1 for key in before - after})
+        deltas.update({key: 1 for key in after - before})
+
+    params = [
+        {"dimension": dim, "value": value, "count": delta}
+        for (dim, value), delta in deltas.items()
+        if delta
+    ]
+    if not params:
+        return
+
+    dialect = db.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(models.TaskCounter.__table__)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["dimension", "value"],
+            set_={"count": stmt.table.c.count + stmt.excluded.count},
+        ),
+        params,
+    )
+
+
+def track_inserted_tasks(db: Session, rows: list[dict]):
+    """Counter bookkeeping for tasks inserted outside crud (bulk import). Caller commits."""
+    _apply_counter_changes(db, [(None, _counter_keys(SimpleNamespace(**row))) for row in rows])
+
+
+def rebuild_task_counters(db: Session) -> int:
+    """Recompute task_counters from the tasks table. Returns rows written."""
+    rows = [("total", "", db.query(func.count(models.Task.id)).scalar())]
+    for dim in _COUNTER_DIMENSIONS:
+        col = getattr(models.Task, dim)
+        rows += [
+            (dim, _plain(value), n)
+            for value, n in db.query(col, func.count(models.Task.id)).group_by(col)
+        ]
+
+    db.query(models.TaskCounter).delete()
+    db.add_all(
+        models.TaskCounter(dimension=dim, value=value, count=n) for dim, value, n in rows
+    )
+    db.commit()
+    return len(rows)
+
+
+def _counts_from_group_by(db: Session):
+    """One GROUP BY over every (status, priority, assigned_to) combination."""
+    cols = [getattr(models.Task, dim) for dim in _COUNTER_DIMENSIONS]
+    counts = {dim: {} for dim in _COUNTER_DIMENSIONS}
+    total = 0
+    for *values, n in db.query(*cols, func.count(models.Task.id)).group_by(*cols):
+        total += n
+        for dim, value in zip(_COUNTER_DIMENSIONS, values):
+            key = _plain(value)
+            counts[dim][key] = counts[dim].get(key, 0) + n
+    return total, counts
+
+
+def _counts_from_counters(db: Session):
+    counts = {dim: {} for dim in _COUNTER_DIMENSIONS}
+    total = 0
+    for row in db.query(models.TaskCounter).filter(models.TaskCounter.count != 0):
+        if row.dimension == "total":
+            total = row.count
+        elif row.dimension in counts:
+            counts[row.dimension][row.value] = row.count
+    return total, counts
+
+
+def task_stats(db: Session, due_soon_limit: int = 4) -> dict:
+    """Board header numbers: totals by status/priority/assignee plus due-soon tasks."""
+    if settings.TASK_STATS_COUNTERS:
+        total, counts = _counts_from_counters(db)
+    else:
+        total, counts = _counts_from_group_by(db)
+
+    by_assignee = counts["assigned_to"]
+    due_soon = (
+        db.query(models.Task)
+        .filter(models.Task.end_date.isnot(None))
+        .order_by(models.Task.end_date.asc(), models.Task.id.asc())
+        .limit(due_soon_limit)
+        .all()
+    )
+    return {
+        "total": total,
+        "by_status": counts["status"],
+        "by_priority": counts["priority"],
+        "by_assignee": {k: v for k, v in by_assignee.items() if k},
+        "unassigned": by_assignee.get("", 0),
+        "due_soon": due_soon,
+    }
 
 
 # ---------- COMMENTS ----------
@@ -103,6 +484,12 @@ def create_comment_for_task(
         author=comment_in.author,
     )
     db.add(db_comment)
+    db.flush()
+
+    task = get_task(db, task_id)
+    if task:
+        search.index_task(db, task)
+
     db.commit()
     db.refresh(db_comment)
     return db_comment
@@ -119,23 +506,38 @@ def get_attachments_for_task(db: Session, task_id: int):
 
 
 def get_attachment(db: Session, attachment_id: int):
-    return (
-        db.query(models.Attachment)
-        .filter(models.Attachment.id == attachment_id)
-        .first()
-    )
+    return db.scalars(ATTACHMENT_BY_ID, {"attachment_id": attachment_id}).first()
 
-def add_attachment(db: Session, task_id: int, filename: str, filepath: str):
+def add_attachment(
+    db: Session, task_id: int, filename: str, sha256: str, size: int, content_type: str
+):
+    """
+    Record an attachment whose content is the blob `sha256`, taking a
+    reference to it. The caller stores the file once this has committed.
+    """
+    blobs.acquire(db, sha256, size)
     att = models.Attachment(
         task_id=task_id,
         filename=filename,
-        filepath=filepath
+        filepath=blobs.relative_path(sha256),
+        sha256=sha256,
+        size=size,
+        content_type=content_type,
     )
     db.add(att)
     db.commit()
     db.refresh(att)
     return att
 
+
+def delete_attachment(db: Session, attachment_id: int) -> bool:
+    """Delete an attachment, dropping its blob reference. Return False if not found."""
+    attachment_filter = models.Attachment.id == attachment_id
+    blobs.release(db, attachment_filter)
+    deleted = db.execute(delete(models.Attachment).where(attachment_filter)).rowcount
+    db.commit()
+    return bool(deleted)
+
 def get_attachments(db: Session, task_id: int):
     return (
         db.query(models.Attachment)
@@ -148,7 +550,7 @@ def get_attachments(db: Session, task_id: int):
 # ---------- USERS ----------
 
 def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+    return db.scalars(USER_BY_USERNAME, {"username": username}).first()
 
 
 def create_user(db: Session, user_in: schemas.UserCreate, hashed_password: str):
@@ -161,3 +563,8 @@ def create_user(db: Session, user_in: schemas.UserCreate, hashed_password: str):
     db.commit()
     db.refresh(user)
     return user
+
+
+def set_user_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
@@ -1,17 +1,98 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
 
+from . import pool_metrics
+
 load_dotenv()
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # serve /tasks/stats from the task_counters table instead of a GROUP BY;
+    # run `python -m app.cli rebuild-counters` after switching it on
+    TASK_STATS_COUNTERS: bool = False
+    # most items accepted by one /tasks:batch request
+    TASK_BATCH_MAX_SIZE: int = 1000
+    # users remembered by get_current_user between requests (0 disables)
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    # put id and role in access tokens and trust them instead of looking the
+    # user up; a role change then only takes effect when the token expires
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+    # verified access tokens whose claims are kept until they expire (0 disables)
+    TOKEN_CACHE_SIZE: int = 4096
+    # revoked tokens each process's Bloom filter is sized for before it is
+    # rebuilt larger, and how often it picks up other processes' revocations
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    # connection pool, per worker process: at most POOL_SIZE + MAX_OVERFLOW
+    # connections; a checkout gives up after POOL_TIMEOUT seconds
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # test connections before use / replace them after this many seconds
+    # (-1 = never), to survive server-side idle timeouts
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1
+    # URL for the async engine; by default DATABASE_URL with its driver
+    # swapped for asyncpg / aiosqlite
+    ASYNC_DATABASE_URL: str | None = None
+    # comma separated read replicas for the GET routes (see app/replicas.py),
+    # and how long a client reads from the primary after it writes
+    DATABASE_REPLICA_URLS: str = ""
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # processes that hash and verify passwords (0 = on the request threadpool)
+    # and how many calls may wait for one before sign-ins get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    # pbkdf2_sha256 rounds for new hashes (`python -m app.cli calibrate-hash`);
+    # login rehashes stored hashes outside MIN..MAX, which default to ROUNDS
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_MIN_ROUNDS: int | None = None
+    PASSWORD_HASH_MAX_ROUNDS: int | None = None
+    # where attachment files are received (and kept, with the local backend),
+    # and the largest one accepted (uploads are cut off once they pass it)
+    UPLOAD_DIR: str = os.path.join(os.path.dirname(__file__), "uploads")
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    # blobs (and stray upload temp files) unreferenced for this long are
+    # removed by `python -m app.cli gc-blobs`
+    BLOB_GC_GRACE_SECONDS: int = 3600
+    # "local" (UPLOAD_DIR) or "s3" (see app/storage.py); S3_ENDPOINT_URL is for
+    # S3-compatible servers such as MinIO, S3_PREFIX is prepended to every key
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    # lifetime of the presigned URLs downloads redirect to
+    S3_PRESIGN_SECONDS: int = 300
+    # threads making image previews (see app/thumbnails.py) and how many more
+    # jobs may wait for them before new ones are turned away
+    THUMBNAIL_WORKERS: int = 2
+    THUMBNAIL_MAX_QUEUE: int = 32
 
 settings = Settings()
 
-engine = create_engine(settings.DATABASE_URL)
+
+def pool_options() -> dict:
+    """Pool settings shared by every engine: primary, async and replicas."""
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+engine = create_engine(
+    settings.DATABASE_URL, poolclass=pool_metrics.TimedQueuePool, **pool_options()
+)
+pool_metrics.install(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class Base(DeclarativeBase):
@@ -23,3 +104,40 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------- async stack ----------
+# Created on first use so the sync app never needs an async driver installed.
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(url: str):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+
+@lru_cache(maxsize=None)
+def async_engine():
+    engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL or async_url(settings.DATABASE_URL),
+        poolclass=pool_metrics.TimedAsyncQueuePool,
+        **pool_options(),
+    )
+    pool_metrics.install(engine.sync_engine, "async")
+    return engine
+
+
+@lru_cache(maxsize=None)
+def _async_sessions():
+    # objects stay readable after commit, since an AsyncSession can't lazy-load
+    return async_sessionmaker(async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    db: AsyncSession = _async_sessions()()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,80 @@
+"""
+HTTP caching for attachment downloads.
+
+An attachment's content never changes once uploaded, so its SHA-256 is a
+strong ETag and its upload time a safe Last-Modified. ``not_modified``
+applies If-None-Match / If-Modified-Since (RFC 9110 section 13.2.2: the
+ETag check wins when both are sent) so repeat views cost a 304 with no
+body. For local files, Range, If-Range and 206 responses are left to
+Starlette's FileResponse, which honours the validators set here; with
+S3 storage the presigned URL clients are redirected to serves them.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import quote
+
+# content is immutable per attachment id, but a private cache should still
+# check back now and then in case the attachment was deleted
+CACHE_CONTROL = "private, max-age=3600"
+
+# types a browser may render in place (previews, <video>, PDF viewer); anything
+# else, including HTML and SVG that could run script, is served as a download
+_INLINE_PREFIXES = ("image/", "video/", "audio/")
+_INLINE_TYPES = {"application/pdf", "text/plain"}
+_NEVER_INLINE = {"image/svg+xml"}
+
+
+def etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def http_date(moment: datetime) -> str:
+    if moment.tzinfo is None:  # SQLite hands back naive UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def disposition(content_type: str) -> str:
+    if content_type in _NEVER_INLINE:
+        return "attachment"
+    if content_type in _INLINE_TYPES or content_type.startswith(_INLINE_PREFIXES):
+        return "inline"
+    return "attachment"
+
+
+def content_disposition(content_type: str, filename: str) -> str:
+    """Content-Disposition header value, as FileResponse would build it."""
+    kind = disposition(content_type)
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{kind}; filename*=utf-8''{quoted}"
+    return f'{kind}; filename="{filename}"'
+
+
+def _etag_matches(header: str, current: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == current for tag in tags)
+
+
+def not_modified(headers, current_etag: str, last_modified: datetime) -> bool:
+    """Whether a GET with these request headers can be answered with a 304."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, current_etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision
+    return int(last_modified.timestamp()) <= int(since.timestamp())
@@ -0,0 +1,192 @@
+"""
+Streaming bulk import of tasks (POST /tasks:import).
+
+The upload is parsed incrementally, validated against schemas.TaskCreate a
+chunk at a time, and each chunk is written and committed on its own: COPY
+on Postgres, an executemany INSERT elsewhere. Progress is reported after
+every chunk, so a bad row costs an error entry rather than the whole file.
+Both paths get the new ids back from RETURNING, so the search index and
+counters only ever see this import's rows, whatever else is writing.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import crud, models, schemas, search
+from .database import SessionLocal
+
+FORMATS = ("csv", "ndjson")
+
+IMPORT_COLUMNS = [
+    "task_name",
+    "status",
+    "assigned_to",
+    "start_date",
+    "end_date",
+    "priority",
+    "description",
+    "priority_rank",
+    "status_rank",
+]
+
+
+def guess_format(filename: str | None, content_type: str | None) -> str | None:
+    """Pick csv/ndjson from the upload's extension or content type."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or content_type == "application/x-ndjson":
+        return "ndjson"
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    return None
+
+
+def iter_records(fileobj, fmt: str):
+    """
+    Yield (line number, record dict or error message) from a binary file
+    object without reading it all into memory. Input that cannot be read
+    at all (not UTF-8, malformed CSV) ends the records with one error, so
+    the import still finishes and reports it.
+    """
+    decoded = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(decoded)
+        try:
+            for record in reader:
+                # empty cells mean "not given", so schema defaults still apply
+                yield reader.line_num, {k: v for k, v in record.items() if k and v != ""}
+        except (UnicodeDecodeError, csv.Error) as exc:
+            yield reader.line_num + 1, f"unreadable input, import stopped: {exc}"
+        return
+
+    line_no = 0
+    try:
+        for line_no, line in enumerate(decoded, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, f"invalid JSON: {exc}"
+                continue
+            yield line_no, record if isinstance(record, dict) else "expected a JSON object"
+    except UnicodeDecodeError as exc:
+        yield line_no + 1, f"unreadable input, import stopped: {exc}"
+
+
+def _row(task: schemas.TaskCreate) -> dict:
+    row = {k: getattr(v, "value", v) for k, v in task.model_dump().items()}
+    row["priority_rank"] = models.PRIORITY_RANKS.get(row["priority"])
+    row["status_rank"] = models.STATUS_RANKS.get(row["status"])
+    return row
+
+
+def _validate(chunk):
+    rows, errors = [], []
+    for line_no, record in chunk:
+        if isinstance(record, str):
+            errors.append({"line": line_no, "error": record})
+            continue
+        try:
+            rows.append(_row(schemas.TaskCreate.model_validate(record)))
+        except ValidationError as exc:
+            errors.append({"line": line_no, "error": schemas.validation_message(exc)})
+    return rows, errors
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(db, rows: list[dict]):
+    """
+    COPY rows into tasks on the session's own connection/transaction;
+    returns (id, task_name, description) of each new task. COPY can't
+    return ids, so the rows go to a temp table first and on into tasks
+    with INSERT ... SELECT ... RETURNING.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[c]) for c in IMPORT_COLUMNS) + "\n")
+    buffer.seek(0)
+
+    columns = ", ".join(IMPORT_COLUMNS)
+    db.execute(text(
+        f"CREATE TEMP TABLE task_import ON COMMIT DROP AS "
+        f"SELECT {columns} FROM tasks WITH NO DATA"
+    ))
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY task_import ({columns}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    return db.execute(text(
+        f"INSERT INTO tasks ({columns}) SELECT {columns} FROM task_import "
+        "RETURNING id, task_name, description"
+    )).all()
+
+
+def _insert_chunk(db, rows: list[dict]):
+    if db.get_bind().dialect.name == "postgresql":
+        new_tasks = _copy_rows(db, rows)
+    else:
+        table = models.Task.__table__
+        new_tasks = db.execute(
+            insert(table).returning(table.c.id, table.c.task_name, table.c.description), rows
+        ).all()
+
+    search.index_tasks(db, new_tasks, with_comments=False)
+    crud.track_inserted_tasks(db, rows)
+    db.commit()
+
+
+def import_tasks(db, fileobj, fmt: str, chunk_size: int = 1000):
+    """Import the file chunk by chunk, yielding a progress dict after each chunk."""
+    records = iter_records(fileobj, fmt)
+    processed = imported = failed = 0
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        rows, errors = _validate(chunk)
+        failed += len(errors)
+        if rows:
+            try:
+                _insert_chunk(db, rows)
+                imported += len(rows)
+            except SQLAlchemyError as exc:
+                db.rollback()
+                failed += len(rows)
+                errors.append({
+                    "line": chunk[0][0],
+                    "error": f"chunk rejected ({len(rows)} rows): {getattr(exc, 'orig', None) or exc}",
+                })
+
+        processed += len(chunk)
+        yield {"processed": processed, "imported": imported, "failed": failed, "errors": errors}
+
+    yield {"done": True, "processed": processed, "imported": imported, "failed": failed}
+
+
+def stream_import(fileobj, fmt: str, chunk_size: int = 1000):
+    """NDJSON progress stream for an import; owns its session like export.stream_tasks."""
+    db = SessionLocal()
+    try:
+        for progress in import_tasks(db, fileobj, fmt, chunk_size=chunk_size):
+            yield json.dumps(progress) + "\n"
+    finally:
+        db.close()
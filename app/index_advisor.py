@@ -0,0 +1,115 @@
+"""
+Replay every query shape crud.list_tasks can generate through EXPLAIN and
+report the ones the database can't serve from an index.
+
+    python -m app.cli explain-queries
+
+A shape is flagged when the plan scans the whole tasks table without an
+index, or when it has to sort rows instead of reading them in index order.
+The free-text `q` filter is left out: it is served by the search index.
+Run it against a database with realistic data and fresh statistics
+(ANALYZE); planners prefer sequential scans on near-empty tables.
+"""
+from datetime import date
+from itertools import product
+
+from sqlalchemy.orm import Session
+
+from . import crud
+from .pagination import encode_cursor
+
+_SAMPLE_FILTERS = {"status": "Considered", "assigned_to": "someone"}
+
+_SAMPLE_VALUES = {
+    "id": 1,
+    "task_name": "m",
+    "status": 0,
+    "start_date": date(2024, 1, 1),
+    "end_date": date(2024, 1, 1),
+    "priority": 1,
+}
+
+
+def query_shapes():
+    """Yield the list_tasks kwargs for every filter x sort x paging combination."""
+    filter_sets = [{}, {"status"}, {"assigned_to"}, {"status", "assigned_to"}]
+    for filters, sort_by, order, paging in product(
+        filter_sets, crud.TASK_SORT_COLUMNS, ["asc", "desc"], ["offset", "cursor"]
+    ):
+        kwargs = {name: _SAMPLE_FILTERS[name] for name in filters}
+        kwargs.update(sort_by=sort_by, order=order)
+        if paging == "cursor":
+            kwargs["cursor"] = encode_cursor(sort_by, order, _SAMPLE_VALUES[sort_by], 1)
+        yield kwargs
+
+
+def _plan(db: Session, query) -> list[str]:
+    conn = db.connection()
+    compiled = query.limit(50).compile(dialect=conn.dialect)
+
+    if conn.dialect.name == "sqlite":
+        params = tuple(
+            v.isoformat() if isinstance(v, date) else v
+            for v in (compiled.params[k] for k in compiled.positiontup)
+        )
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).all()
+    return [row[0] for row in rows]
+
+
+def _problems(plan: list[str], filtered: bool) -> list[str]:
+    problems = []
+    for line in plan:
+        text = line.strip()
+        if "Seq Scan on tasks" in text:
+            problems.append("full scan")
+        # SQLite walks the rowid in order for a bare SCAN, which only
+        # hurts when a filter has to be checked against every row
+        elif text.startswith("SCAN tasks") and "USING" not in text and filtered:
+            problems.append("full scan")
+        elif "TEMP B-TREE FOR ORDER BY" in text or text.lstrip("-> ").startswith("Sort"):
+            problems.append("sort")
+    return problems
+
+
+def advise(db: Session):
+    """Return [(kwargs, problems, plan), ...] for every list_tasks shape."""
+    report = []
+    for kwargs in query_shapes():
+        plan = _plan(db, crud.tasks_query(db, **kwargs))
+        filtered = any(name in kwargs for name in _SAMPLE_FILTERS)
+        report.append((kwargs, _problems(plan, filtered), plan))
+    return report
+
+
+def print_report(report, verbose: bool = False) -> int:
+    """
+    Print one line per shape and return how many need a full table scan.
+    Shapes that find rows through an index but still sort them are listed
+    as SORT; they are cheap while the filter is selective.
+    """
+    missing = 0
+    sorting = 0
+    for kwargs, problems, plan in report:
+        shape = ", ".join(
+            f"{k}={'<cursor>' if k == 'cursor' else v}" for k, v in kwargs.items()
+        )
+        if "full scan" in problems:
+            label = "MISS"
+            missing += 1
+        elif problems:
+            label = "SORT"
+            sorting += 1
+        else:
+            label = "OK  "
+        print(f"{label} {shape}")
+        if verbose or problems:
+            for line in plan:
+                print(f"       {line}")
+    print(
+        f"{len(report)} query shapes: {missing} without an index, "
+        f"{sorting} sorted after an index lookup"
+    )
+    return missing
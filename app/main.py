@@ -1,33 +1,29 @@
+from . import startup_profile  # first, so the import phase covers everything below
+
 import os
-import uuid
-import shutil
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
-from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import Base, engine, get_db
-from . import models, schemas, crud
-from typing import List, Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-
-
-
-
-Base.metadata.create_all(bind=engine)
+from .database import engine, get_async_db, get_db, settings
+from . import (
+    schemas, crud, async_crud, blobs, downloads, export, importer, migrations,
+    passwords, pool_metrics, replicas, revocation, search, storage, thumbnails, tokens, uploads,
+    user_cache,
+)
+from typing import Any, Dict, List, Optional
 
+startup_profile.mark("imports")
 
 app = FastAPI()
-UPLOAD_DIR = "app/uploads"
+UPLOAD_DIR = settings.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 ALLOWED_ORIGINS = [
@@ -43,51 +39,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(replicas.StickyPrimaryMiddleware)
 
 # ---------------- AUTH CONFIG -----------------
-SECRET_KEY = "super-secret-key-change-this"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-
-# 🔹 Use pbkdf2_sha256 instead of bcrypt
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-)
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def _sanitize_password(password: str) -> str:
-    """
-    Ensure password is a string. (No 72-byte limit now, but this is safe.)
-    """
-    if not isinstance(password, str):
-        password = str(password)
-    return password
+@app.on_event("startup")
+def check_schema_version():
+    # schema changes are applied by `python -m app.cli migrate`, never here
+    startup_profile.resume()
+    migrations.check(engine)
+    startup_profile.mark("startup hooks")
+    startup_profile.write()
+
 
+@app.on_event("shutdown")
+def stop_password_pool():
+    passwords.shutdown()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    pw = _sanitize_password(plain_password)
-    return pwd_context.verify(pw, hashed_password)
 
+@app.on_event("shutdown")
+def stop_thumbnail_pool():
+    thumbnails.shutdown()
 
-def get_password_hash(password: str) -> str:
-    pw = _sanitize_password(password)
-    return pwd_context.hash(pw)
 
+async def _hashing(fn, *args):
+    try:
+        return await fn(*args)
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 # ---------------- TASK ENDPOINTS -----------------
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     credentials_exception = HTTPException(
         status_code=401,
@@ -96,65 +89,234 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = tokens.decode_token(token)
         username: str | None = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("typ") == "refresh":
             raise credentials_exception
-    except JWTError:
+    except tokens.InvalidToken:
         raise credentials_exception
 
-    user = crud.get_user_by_username(db, username)
-    if user is None:
+    if "jti" in payload and await db.run_sync(revocation.revoked.is_revoked, payload["jti"]):
         raise credentials_exception
 
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "uid" in payload and "role" in payload:
+        return user_cache.CachedUser(id=payload["uid"], username=username, role=payload["role"])
+
+    user = user_cache.cache.get(username)
+    if user is None:
+        db_user = await async_crud.get_user_by_username(db, username)
+        if db_user is None:
+            raise credentials_exception
+        user = user_cache.snapshot(db_user)
+        user_cache.cache.put(user)
+
     return user
 
 
-def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
+def get_current_admin_user(current_user: user_cache.CachedUser = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     return current_user
 
-@app.get("/tasks/{task_id}", response_model=schemas.TaskOut)
-def get_task_by_id(task_id: int, db: Session = Depends(get_db)):
-    task = crud.get_task(db, task_id)
+@app.get("/tasks/search", response_model=List[schemas.TaskSearchHit])
+def search_tasks(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(replicas.get_read_db),
+):
+    hits = search.search_tasks(db, q, limit=limit, offset=offset)
+    return [{"task": task, "rank": rank} for task, rank in hits]
+
+
+@app.get("/tasks/export")
+def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = Query(None),
+    assigned_to: Optional[str] = Query(None),
+    q: Optional[str] = Query(None),
+    sort_by: str = Query("id"),
+    order: str = Query("asc"),
+):
+    body = export.stream_tasks(
+        format,
+        status=status,
+        assigned_to=assigned_to,
+        q=q,
+        sort_by=sort_by,
+        order=order,
+    )
+    return StreamingResponse(
+        body,
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+@app.get("/tasks/stats", response_model=schemas.TaskStats)
+def task_stats(
+    due_soon: int = Query(4, ge=0, le=50),
+    db: Session = Depends(replicas.get_read_db),
+):
+    return crud.task_stats(db, due_soon_limit=due_soon)
+
+
+def _csv_param(value: str | None) -> set[str]:
+    """Split a comma separated query parameter into a set of names."""
+    if not value:
+        return set()
+    return {part.strip() for part in value.split(",") if part.strip()}
+
+
+@app.get("/tasks/{task_id}", response_model=schemas.TaskDetail, response_model_exclude_unset=True)
+async def get_task_by_id(
+    task_id: int,
+    expand: Optional[str] = Query(None),  # e.g. "comments,attachments"
+    fields: Optional[str] = Query(None),  # e.g. "task_name,status"
+    db: AsyncSession = Depends(replicas.get_async_read_db),
+):
+    expand_set = _csv_param(expand)
+    unknown = expand_set - schemas.TASK_EXPANSIONS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown expand: {', '.join(sorted(unknown))}")
+
+    field_set = _csv_param(fields)
+    unknown = field_set - schemas.TaskOut.model_fields.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    task = await async_crud.get_task_detail(db, task_id, expand_set)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+
+    # only touch the relationships that were eager-loaded
+    values = {name: getattr(task, name) for name in schemas.TaskOut.model_fields}
+    values.update((name, getattr(task, name)) for name in expand_set)
+    detail = schemas.TaskDetail.model_validate(values, from_attributes=True)
+
+    include = field_set | expand_set | {"id"} if field_set else None
+    return JSONResponse(detail.model_dump(mode="json", include=include, exclude_unset=True))
 
 
 @app.post("/tasks", response_model=schemas.TaskOut, status_code=201)
-def create_task(
+async def create_task(
     payload: schemas.TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_cache.CachedUser = Depends(get_current_admin_user),
 ):
-    return crud.add_task(db, payload)
+    return await async_crud.create_task(db, payload)
 
 
 @app.patch("/tasks/{task_id}", response_model=schemas.TaskOut)
-def patch_task(task_id: int, payload: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_task(db, task_id, payload)
+async def patch_task(
+    task_id: int, payload: schemas.TaskUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    updated = await async_crud.update_task(db, task_id, payload)
     if not updated:
         raise HTTPException(status_code=404, detail="Task not found")
     return updated
 
 
 @app.delete("/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_cache.CachedUser = Depends(get_current_admin_user),
 ):
-    ok = crud.delete_task(db, task_id)
+    ok = await async_crud.delete_task(db, task_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"deleted": True, "id": task_id}
 
 
 
+# ---------------- BATCH ENDPOINTS -----------------
+
+
+def _check_batch_size(items: list):
+    if len(items) > settings.TASK_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.TASK_BATCH_MAX_SIZE} items)",
+        )
+
+
+def _validate_items(model, items: list):
+    """Validate each raw item on its own; return ([(index, model)], [BatchItemError])."""
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as exc:
+            errors.append(schemas.BatchItemError(index=index, error=schemas.validation_message(exc)))
+    return valid, errors
+
+
+@app.post("/tasks:batch", response_model=schemas.TaskBatchResult)
+def create_tasks_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_db),
+    current_user: user_cache.CachedUser = Depends(get_current_admin_user),
+):
+    _check_batch_size(items)
+    valid, errors = _validate_items(schemas.TaskCreate, items)
+    tasks = crud.create_tasks(db, [item for _, item in valid])
+    return {"items": tasks, "errors": errors}
+
+
+@app.patch("/tasks:batch", response_model=schemas.TaskBatchResult)
+def patch_tasks_batch(items: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    _check_batch_size(items)
+    valid, errors = _validate_items(schemas.TaskBatchUpdate, items)
+    tasks, missing = crud.update_tasks(db, [item for _, item in valid])
+
+    missing = set(missing)
+    errors += [
+        schemas.BatchItemError(index=index, id=item.id, error="Task not found")
+        for index, item in valid
+        if item.id in missing
+    ]
+    return {"items": tasks, "errors": sorted(errors, key=lambda e: e.index)}
+
+
+@app.delete("/tasks:batch", response_model=schemas.TaskBatchDeleteResult)
+def delete_tasks_batch(
+    ids: List[int] = Body(..., embed=True),
+    db: Session = Depends(get_db),
+    current_user: user_cache.CachedUser = Depends(get_current_admin_user),
+):
+    _check_batch_size(ids)
+    deleted = crud.delete_tasks(db, ids)
+
+    found = set(deleted)
+    errors = [
+        schemas.BatchItemError(index=index, id=task_id, error="Task not found")
+        for index, task_id in enumerate(ids)
+        if task_id not in found
+    ]
+    return {"deleted": deleted, "errors": errors}
+
+
+@app.post("/tasks:import")
+def import_tasks(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),  # csv | ndjson, else guessed from the upload
+    current_user: user_cache.CachedUser = Depends(get_current_admin_user),
+):
+    fmt = format or importer.guess_format(file.filename, file.content_type)
+    if fmt not in importer.FORMATS:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .ndjson file")
+
+    # one JSON progress line per imported chunk, then a final {"done": true, ...}
+    return StreamingResponse(
+        importer.stream_import(file.file, fmt),
+        media_type="application/x-ndjson",
+    )
+
+
 @app.get("/tasks", response_model=List[schemas.TaskOut])
-def list_tasks(
+async def list_tasks(
+    response: Response,
     status: Optional[str] = Query(None),
     assigned_to: Optional[str] = Query(None),
     q: Optional[str] = Query(None),
@@ -162,31 +324,41 @@ def list_tasks(
     offset: int = Query(0, ge=0),
     sort_by: str = Query("id"),
     order: str = Query("asc"),  # asc | desc
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),  # from a previous X-Next-Cursor
+    db: AsyncSession = Depends(replicas.get_async_read_db),
 ):
-    return crud.list_tasks(
-        db,
-        status=status,
-        assigned_to=assigned_to,
-        q=q,
-        limit=limit,
-        offset=offset,
-        sort_by=sort_by,
-        order=order,
-    )
+    try:
+        tasks = await async_crud.list_tasks(
+            db,
+            status=status,
+            assigned_to=assigned_to,
+            q=q,
+            limit=limit,
+            offset=offset,
+            sort_by=sort_by,
+            order=order,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # a full page means there may be more rows after it
+    if len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = crud.task_cursor(tasks[-1], sort_by, order)
+    return tasks
 
 
 # ---------------- COMMENT ENDPOINTS -----------------
 
 
 @app.get("/tasks/{task_id}/comments", response_model=List[schemas.CommentOut])
-def list_comments(task_id: int, db: Session = Depends(get_db)):
-    # ensure task exists
-    task = crud.get_task(db, task_id)
-    if not task:
+async def list_comments(task_id: int, db: AsyncSession = Depends(replicas.get_async_read_db)):
+    comments = await async_crud.get_comments_for_task(db, task_id)
+    # only an empty result needs the existence check
+    if not comments and not await async_crud.get_task(db, task_id):
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return crud.get_comments_for_task(db, task_id)
+    return comments
 
 
 @app.post(
@@ -194,13 +366,15 @@ def list_comments(task_id: int, db: Session = Depends(get_db)):
     response_model=schemas.CommentOut,
     status_code=201,
 )
-def add_comment(task_id: int, payload: schemas.CommentCreate, db: Session = Depends(get_db)):
+async def add_comment(
+    task_id: int, payload: schemas.CommentCreate, db: AsyncSession = Depends(get_async_db)
+):
     # ensure task exists
-    task = crud.get_task(db, task_id)
+    task = await async_crud.get_task(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return crud.create_comment_for_task(db, task_id, payload)
+    return await async_crud.create_comment_for_task(db, task_id, payload)
 
 # ---------------- ATTACHMENT ENDPOINTS -----------------
 
@@ -211,66 +385,179 @@ def add_comment(task_id: int, payload: schemas.CommentCreate, db: Session = Depe
     "/tasks/{task_id}/attachments",
     response_model=List[schemas.AttachmentOut],
 )
-def list_attachments(task_id: int, db: Session = Depends(get_db)):
-    # optional: ensure task exists
-    task = crud.get_task(db, task_id)
-    if not task:
+async def list_attachments(task_id: int, db: AsyncSession = Depends(replicas.get_async_read_db)):
+    attachments = await async_crud.get_attachments_for_task(db, task_id)
+    # only an empty result needs the existence check
+    if not attachments and not await async_crud.get_task(db, task_id):
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return crud.get_attachments_for_task(db, task_id)
+    return attachments
 
 
 @app.post(
     "/tasks/{task_id}/attachments",
     response_model=schemas.AttachmentOut,
     status_code=201,
+    # the body is parsed by uploads.receive_file, so describe it by hand
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
 )
 async def upload_attachment(
     task_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # ensure task exists
-    task = crud.get_task(db, task_id)
-    if not task:
+    # ensure task exists before reading the body
+    if not await async_crud.get_task(db, task_id):
         raise HTTPException(status_code=404, detail="Task not found")
+    # hand the connection back to the pool while the body streams in; a slow
+    # client must not hold one for the whole upload
+    await db.rollback()
 
-    # create unique stored filename
-    stored_name = f"{uuid.uuid4().hex}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, stored_name)
-
-    # save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # save DB record (we store relative path)
-    att = crud.create_attachment(
-        db=db,
-        task_id=task_id,
-        filename=file.filename,
-        filepath=stored_name,
-    )
+    try:
+        upload = await uploads.receive_file(request, UPLOAD_DIR, settings.UPLOAD_MAX_BYTES)
+    except uploads.UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except uploads.UploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
+    # reference the blob first, then put its file in place (see app/blobs.py)
+    try:
+        att = await async_crud.add_attachment(
+            db,
+            task_id=task_id,
+            filename=upload.filename,
+            sha256=upload.sha256,
+            size=upload.size,
+            content_type=upload.content_type,
+        )
+    except BaseException:
+        await run_in_threadpool(uploads.discard, upload.path)
+        raise
+    store = storage.get_storage()
+    try:
+        await run_in_threadpool(blobs.store, store, upload.path, upload.sha256)
+    except BaseException:
+        # don't leave a row pointing at content that never made it to storage
+        await run_in_threadpool(uploads.discard, upload.path)
+        await async_crud.delete_attachment(db, att.id)
+        raise
+    # previews are made in the background so the upload returns right away
+    thumbnails.schedule(store, upload.sha256, att.filepath, upload.content_type)
     return att
 
 
 @app.get("/attachments/{attachment_id}")
-def download_attachment(attachment_id: int, db: Session = Depends(get_db)):
+def download_attachment(attachment_id: int, request: Request, db: Session = Depends(get_db)):
     att = crud.get_attachment(db, attachment_id)
     if not att:
         raise HTTPException(status_code=404, detail="Attachment not found")
+    # rows whose file was already gone when migration 0006 ran have no blob;
+    # checked here because remote storage is never asked whether a file exists
+    if att.sha256 is None:
+        raise HTTPException(status_code=404, detail="File not found on server")
 
-    file_path = os.path.join(UPLOAD_DIR, att.filepath)
-    if not os.path.exists(file_path):
+    store = storage.get_storage()
+    file_path = store.local_path(att.filepath)
+    if file_path is not None and not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found on server")
 
+    etag = downloads.etag(att.sha256)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": downloads.http_date(att.uploaded_at),
+        "Cache-Control": downloads.CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if downloads.not_modified(request.headers, etag, att.uploaded_at):
+        return Response(status_code=304, headers=headers)
+
+    disposition = downloads.content_disposition(att.content_type, att.filename)
+    if file_path is None:
+        # remote storage: send the client to the bucket rather than relaying
+        # the bytes through this worker; the URL expires, so never cache it
+        url = store.presigned_url(att.filepath, att.content_type, disposition)
+        if url:
+            headers["Cache-Control"] = "no-store"
+            return RedirectResponse(url, status_code=307, headers=headers)
+        headers["Content-Disposition"] = disposition
+        if att.size is not None:
+            headers["Content-Length"] = str(att.size)
+        return StreamingResponse(
+            store.iter_chunks(att.filepath), media_type=att.content_type, headers=headers
+        )
+
+    # Range / If-Range / 206 are handled by FileResponse against these headers
     return FileResponse(
         path=file_path,
-        media_type="application/octet-stream",
+        media_type=att.content_type,
         filename=att.filename,
+        headers=headers,
+        content_disposition_type=downloads.disposition(att.content_type),
     )
 
 
+@app.get("/attachments/{attachment_id}/thumb")
+async def attachment_thumbnail(
+    attachment_id: int,
+    request: Request,
+    w: int = Query(320, ge=1, le=4096),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    A WebP preview of an image attachment, at least `w` pixels wide where
+    the image is (widths are rounded up to thumbnails.WIDTHS).
+    """
+    att = await async_crud.get_attachment(db, attachment_id)
+    if not att:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if att.sha256 is None or not thumbnails.supported(att.content_type):
+        raise HTTPException(status_code=404, detail="No preview for this attachment")
+
+    width = thumbnails.snap(w)
+    etag = downloads.etag(f"{att.sha256}-{width}")
+    headers = {
+        "ETag": etag,
+        "Last-Modified": downloads.http_date(att.uploaded_at),
+        "Cache-Control": downloads.CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if downloads.not_modified(request.headers, etag, att.uploaded_at):
+        return Response(status_code=304, headers=headers)
+
+    store = storage.get_storage()
+    try:
+        key = await thumbnails.ensure(store, att.sha256, att.filepath, width)
+    except thumbnails.ThumbnailerBusy:
+        # the original still shows, just heavier; not cached so the preview
+        # is asked for again next time
+        original = request.url_for("download_attachment", attachment_id=attachment_id)
+        return RedirectResponse(original, status_code=307, headers={"Cache-Control": "no-store"})
+    except thumbnails.ThumbnailError:
+        raise HTTPException(status_code=404, detail="No preview for this attachment")
+
+    file_path = store.local_path(key)
+    if file_path is None:
+        url = store.presigned_url(key, "image/webp", "inline")
+        if url:
+            headers["Cache-Control"] = "no-store"
+            return RedirectResponse(url, status_code=307, headers=headers)
+        return StreamingResponse(store.iter_chunks(key), media_type="image/webp", headers=headers)
+    return FileResponse(path=file_path, media_type="image/webp", headers=headers)
+
+
 
 
 
@@ -278,34 +565,116 @@ def download_attachment(attachment_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/signup", response_model=schemas.UserOut)
-def signup(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_username(db, user_in.username)
+async def signup(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await async_crud.get_user_by_username(db, user_in.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    hashed_pw = get_password_hash(user_in.password)
-    user = crud.create_user(db, user_in, hashed_pw)
+    hashed_pw = await _hashing(passwords.hash_password, user_in.password)
+    user = await async_crud.create_user(db, user_in, hashed_pw)
     return user
 
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = crud.get_user_by_username(db, form_data.username)
+    user = await async_crud.get_user_by_username(db, form_data.username)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
-    if not verify_password(form_data.password, user.hashed_password):
+    ok, new_hash = await _hashing(
+        passwords.verify_and_update, form_data.password, user.hashed_password
+    )
+    if not ok:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if new_hash:
+        # stored hash predates the current rounds policy
+        await async_crud.set_user_password_hash(db, user, new_hash)
 
-    access_token = create_access_token(data={"sub": user.username})
-    return schemas.Token(access_token=access_token, token_type="bearer")
+    return _issue_tokens(user)
+
+
+def _issue_tokens(user) -> schemas.Token:
+    claims = {"sub": user.username}
+    if settings.AUTH_TRUST_TOKEN_CLAIMS:
+        claims.update(uid=user.id, role=user.role)
+    return schemas.Token(
+        access_token=tokens.create_access_token(data=claims),
+        refresh_token=tokens.create_refresh_token(data={"sub": user.username}),
+        token_type="bearer",
+    )
+
+
+def _revoke(db: Session, claims: dict) -> int:
+    """Revoke the token's jti; the rows inserted (0 if already revoked or no jti)."""
+    if "jti" not in claims:
+        return 0
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    return revocation.revoked.revoke(db, claims["jti"], expires_at)
+
+
+@app.post("/auth/refresh", response_model=schemas.Token)
+def refresh(payload: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Trade a refresh token for a new access/refresh pair without a password
+    check. The refresh token is single use: it is revoked here.
+    """
+    invalid = HTTPException(status_code=401, detail="Invalid refresh token")
+    try:
+        claims = tokens.decode_token(payload.refresh_token)
+    except tokens.InvalidToken:
+        raise invalid
+    if claims.get("typ") != "refresh" or "jti" not in claims:
+        raise invalid
+    if revocation.revoked.is_revoked(db, claims["jti"]):
+        raise invalid
+
+    user = crud.get_user_by_username(db, claims.get("sub"))
+    if user is None:
+        raise invalid
+
+    # the insert decides between concurrent refreshes of the same token:
+    # only the one that actually revoked it gets a new pair
+    if not _revoke(db, claims):
+        raise invalid
+    return _issue_tokens(user)
+
+
+@app.post("/auth/logout", status_code=204)
+def logout(
+    payload: schemas.RefreshRequest | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    """Revoke the bearer access token and, if given, its refresh token."""
+    for raw in filter(None, [token, payload and payload.refresh_token]):
+        try:
+            _revoke(db, tokens.decode_token(raw))
+        except tokens.InvalidToken:
+            pass
+    return Response(status_code=204)
 
 
 
 
 @app.get("/auth/me", response_model=schemas.UserOut)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: user_cache.CachedUser = Depends(get_current_user)):
     return current_user
+
+
+@app.get("/auth/user-cache")
+def user_cache_stats(current_user: user_cache.CachedUser = Depends(get_current_admin_user)):
+    return user_cache.cache.stats()
+
+
+# ---------------- METRICS -----------------
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text format, unauthenticated like other scrape targets;
+    # keep it off the public listener in deployment
+    return Response(pool_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+startup_profile.mark("app setup")
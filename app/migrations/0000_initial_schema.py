@@ -0,0 +1,54 @@
+"""
+The four tables the app started with, as create_all made them from the
+models of the time. Frozen here rather than read from app.models, so a
+new database replays 0001 onwards against the same schema an existing
+one upgrades from; later columns, indexes and tables belong to later
+migrations.
+"""
+from sqlalchemy import (
+    Column, Date, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, func,
+)
+
+metadata = MetaData()
+
+Table(
+    "tasks", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("task_name", String(200), nullable=False),
+    Column("status", String(50), nullable=False),
+    Column("assigned_to", String(100), nullable=True),
+    Column("start_date", Date, nullable=True),
+    Column("end_date", Date, nullable=True),
+    Column("priority", String(20), nullable=False),
+    Column("description", Text, nullable=True),
+)
+
+Table(
+    "comments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("task_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False),
+    Column("author", String(100), nullable=True),
+    Column("text", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "attachments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("task_id", Integer, ForeignKey("tasks.id")),
+    Column("filename", String(255)),
+    Column("filepath", String(500)),
+    Column("uploaded_at", DateTime(timezone=True)),
+)
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(100), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("role", String(20), nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn)
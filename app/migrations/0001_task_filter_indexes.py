@@ -0,0 +1,21 @@
+"""Composite indexes for the list_tasks filter/sort shapes and child listings."""
+from sqlalchemy import text
+
+INDEXES = {
+    "ix_tasks_status_id": ("tasks", "status, id"),
+    "ix_tasks_assigned_to_id": ("tasks", "assigned_to, id"),
+    "ix_tasks_task_name_id": ("tasks", "task_name, id"),
+    "ix_tasks_start_date_id": ("tasks", "start_date, id"),
+    "ix_tasks_end_date_id": ("tasks", "end_date, id"),
+    "ix_tasks_priority_id": ("tasks", "priority, id"),
+    "ix_tasks_status_end_date_id": ("tasks", "status, end_date, id"),
+    "ix_tasks_assigned_to_end_date_id": ("tasks", "assigned_to, end_date, id"),
+    "ix_tasks_assigned_to_status_id": ("tasks", "assigned_to, status, id"),
+    "ix_comments_task_id_created_at": ("comments", "task_id, created_at"),
+    "ix_attachments_task_id_uploaded_at": ("attachments", "task_id, uploaded_at"),
+}
+
+
+def upgrade(conn):
+    for name, (table, columns) in INDEXES.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
@@ -0,0 +1,15 @@
+"""Table for the incrementally maintained /tasks/stats counters."""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS task_counters (
+            dimension VARCHAR(20) NOT NULL,
+            value VARCHAR(100) NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value)
+        )
+        """
+    ))
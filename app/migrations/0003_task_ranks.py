@@ -0,0 +1,40 @@
+"""Ordinal priority/status rank columns, backfilled and indexed for sorting."""
+from sqlalchemy import inspect, text
+
+PRIORITY_RANKS = {"Low": 0, "Medium": 1, "High": 2, "Urgent": 3}
+STATUS_RANKS = {
+    "Considered": 0,
+    "Investigation": 1,
+    "Ready To Development": 2,
+    "Under Development": 3,
+    "Code Review": 4,
+    "Development Completed": 5,
+}
+
+INDEXES = {
+    "ix_tasks_priority_rank_id": "priority_rank, id",
+    "ix_tasks_status_rank_id": "status_rank, id",
+    "ix_tasks_status_priority_rank_id": "status, priority_rank, id",
+}
+
+
+def _case(column: str, ranks: dict) -> str:
+    whens = " ".join(f"WHEN '{name}' THEN {rank}" for name, rank in ranks.items())
+    return f"CASE {column} {whens} END"
+
+
+def upgrade(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns("tasks")}
+    for column, ranks in (("priority", PRIORITY_RANKS), ("status", STATUS_RANKS)):
+        rank_column = f"{column}_rank"
+        if rank_column not in existing:
+            conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {rank_column} SMALLINT"))
+        conn.execute(text(
+            f"UPDATE tasks SET {rank_column} = {_case(column, ranks)} "
+            f"WHERE {rank_column} IS NULL"
+        ))
+
+    # priority is now sorted through priority_rank
+    conn.execute(text("DROP INDEX IF EXISTS ix_tasks_priority_id"))
+    for name, columns in INDEXES.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON tasks ({columns})"))
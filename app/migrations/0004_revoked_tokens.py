@@ -0,0 +1,19 @@
+"""Table backing the token revocation list."""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    # SQLite's INTEGER PRIMARY KEY is already an auto-assigned rowid
+    id_type = "SERIAL" if conn.dialect.name == "postgresql" else "INTEGER"
+    conn.execute(text(
+        f"""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id {id_type} PRIMARY KEY,
+            jti VARCHAR(64) NOT NULL UNIQUE,
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+        )
+        """
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at)"
+    ))
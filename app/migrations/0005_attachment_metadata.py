@@ -0,0 +1,16 @@
+"""Content hash, size and MIME type of attachments, for download validators."""
+from sqlalchemy import inspect, text
+
+COLUMNS = {
+    "sha256": "VARCHAR(64)",
+    "size": "BIGINT",
+    "content_type": "VARCHAR(255)",
+}
+
+
+def upgrade(conn):
+    # rows uploaded before this are filled in on their first download
+    existing = {c["name"] for c in inspect(conn).get_columns("attachments")}
+    for column, type_ in COLUMNS.items():
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE attachments ADD COLUMN {column} {type_}"))
@@ -0,0 +1,90 @@
+"""
+Content-addressed blob storage (app/blobs.py), with the existing
+attachment files moved into it: one stored copy per distinct content.
+
+Files are hard-linked into the store (copied where links are not
+possible) and their attachments repointed. The originals are left where
+they were, so a migration that fails part way never loses a file; once it
+has run, ``python -m app.cli purge-pre-blob-files`` deletes each one that
+no attachment points at and whose content is in the store (gc-blobs only
+sweeps blobs/ and thumbs/).
+"""
+import os
+import shutil
+from collections import Counter
+
+from sqlalchemy import inspect, text
+
+from .. import blobs, uploads
+from ..database import settings
+
+
+def _link(src: str, dst: str):
+    if os.path.exists(dst):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        tmp = dst + ".tmp"
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+
+
+def upgrade(conn):
+    upload_dir = settings.UPLOAD_DIR
+    conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 VARCHAR(64) PRIMARY KEY,
+            size BIGINT NOT NULL,
+            refcount INTEGER NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+        )
+        """
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attachments_sha256 ON attachments (sha256)"))
+
+    rows = conn.execute(text(
+        "SELECT id, filename, filepath FROM attachments "
+        f"WHERE filepath NOT LIKE '{blobs.BLOB_DIR}/%'"
+    )).all()
+    refs = Counter()
+    sizes = {}
+    for attachment_id, filename, filepath in rows:
+        path = os.path.join(upload_dir, filepath or "")
+        if not filepath or not os.path.isfile(path):
+            continue  # already missing; downloads keep answering 404
+        sha, size, content_type = uploads.describe_file(path, filename or filepath)
+        _link(path, os.path.join(upload_dir, blobs.relative_path(sha)))
+        conn.execute(
+            text(
+                "UPDATE attachments SET filepath = :filepath, sha256 = :sha, size = :size, "
+                "content_type = COALESCE(content_type, :content_type) WHERE id = :id"
+            ),
+            {
+                "filepath": blobs.relative_path(sha),
+                "sha": sha,
+                "size": size,
+                "content_type": content_type,
+                "id": attachment_id,
+            },
+        )
+        refs[sha] += 1
+        sizes[sha] = size
+
+    for sha, count in refs.items():
+        blobs.acquire(conn, sha, sizes[sha], count)
+
+    # hashes of files that have since gone missing point at no blob
+    conn.execute(text(
+        "UPDATE attachments SET sha256 = NULL WHERE sha256 IS NOT NULL "
+        "AND sha256 NOT IN (SELECT sha256 FROM blobs)"
+    ))
+    if conn.dialect.name == "postgresql" and not any(
+        fk["referred_table"] == "blobs" for fk in inspect(conn).get_foreign_keys("attachments")
+    ):
+        conn.execute(text(
+            "ALTER TABLE attachments ADD CONSTRAINT fk_attachments_sha256_blobs "
+            "FOREIGN KEY (sha256) REFERENCES blobs (sha256)"
+        ))
@@ -0,0 +1,11 @@
+"""
+Full-text search table (app/search.py), backfilled with the tasks that
+are not in it yet: every task when it is new, none when an earlier
+install already keeps it in step.
+"""
+from .. import search
+
+
+def upgrade(conn):
+    search.install(conn)
+    search.backfill(conn)
@@ -0,0 +1,101 @@
+"""
+Schema migrations.
+
+Each module in this package named ``NNNN_description.py`` defines
+``upgrade(conn)`` and is applied in version order by
+``python -m app.cli migrate``. Applied versions are recorded in the
+``schema_migrations`` table, so each script runs once per database.
+Scripts must still be idempotent: databases created before the table
+existed replay all of them on their first migrate.
+
+The app itself never changes the schema; at startup it only calls
+``check`` and refuses to serve a database that is behind the code.
+"""
+import importlib
+import pkgutil
+
+from sqlalchemy import inspect, text
+
+_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# any constant works; it just has to be the same for every migrating process
+_PG_LOCK_KEY = 0x7461736B
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is missing migrations the code depends on."""
+
+
+def discover():
+    """Return [(version, name, module), ...] sorted by version."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        prefix, _, _ = info.name.partition("_")
+        if not prefix.isdigit():
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        found.append((int(prefix), info.name, module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def latest_version() -> int:
+    """Highest version shipped in this package, without importing the scripts."""
+    return max(
+        int(info.name.partition("_")[0])
+        for info in pkgutil.iter_modules(__path__)
+        if info.name.partition("_")[0].isdigit()
+    )
+
+
+def current_version(conn) -> int | None:
+    """Highest applied version, or None if the database was never migrated."""
+    if not inspect(conn).has_table("schema_migrations"):
+        return None
+    return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+
+
+def upgrade(bind) -> list[str]:
+    """Apply every pending migration in order, each in its own transaction."""
+    applied = []
+    with bind.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # serialise concurrent `migrate` runs (e.g. one per deploying worker)
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+        conn.execute(text(_VERSION_TABLE))
+        conn.commit()
+
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+        conn.commit()
+        for version, name, module in discover():
+            if version in done:
+                continue
+            with conn.begin():
+                module.upgrade(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                    {"v": version, "n": name},
+                )
+            applied.append(name)
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+            conn.commit()
+    return applied
+
+
+def check(bind):
+    """Raise SchemaOutOfDate unless every shipped migration has been applied."""
+    with bind.connect() as conn:
+        current = current_version(conn)
+    expected = latest_version()
+    if current is None or current < expected:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current}, the code needs {expected}: "
+            "run `python -m app.cli migrate`"
+        )
@@ -1,8 +1,31 @@
-from sqlalchemy import Column, Integer, String, Date, Text, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String, Date, Text, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime, timezone
 from .database import Base
 
+# severity / workflow order; the *_rank columns store these so sorting by
+# priority or status follows the board's meaning instead of the alphabet
+PRIORITY_RANKS = {"Low": 0, "Medium": 1, "High": 2, "Urgent": 3}
+STATUS_RANKS = {
+    "Considered": 0,
+    "Investigation": 1,
+    "Ready To Development": 2,
+    "Under Development": 3,
+    "Code Review": 4,
+    "Development Completed": 5,
+}
+
+
+def _rank(ranks: dict, value):
+    return ranks.get(getattr(value, "value", value))
+
+
+def _rank_default(column: str, ranks: dict, fallback: str | None = None):
+    """Column default deriving the rank from the same INSERT's parameters."""
+    def default(context):
+        return _rank(ranks, context.get_current_parameters().get(column) or fallback)
+    return default
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -15,17 +38,48 @@ class Task(Base):
     end_date = Column(Date, nullable=True)
     priority = Column(String(20), nullable=False, default="Medium")
     description = Column(Text, nullable=True)
+    priority_rank = Column(
+        SmallInteger, nullable=True, default=_rank_default("priority", PRIORITY_RANKS, "Medium")
+    )
+    status_rank = Column(SmallInteger, nullable=True, default=_rank_default("status", STATUS_RANKS))
+
+    # one index per list_tasks filter/sort shape; id is the keyset tiebreaker
+    __table_args__ = (
+        Index("ix_tasks_status_id", "status", "id"),
+        Index("ix_tasks_assigned_to_id", "assigned_to", "id"),
+        Index("ix_tasks_task_name_id", "task_name", "id"),
+        Index("ix_tasks_start_date_id", "start_date", "id"),
+        Index("ix_tasks_end_date_id", "end_date", "id"),
+        Index("ix_tasks_priority_rank_id", "priority_rank", "id"),
+        Index("ix_tasks_status_rank_id", "status_rank", "id"),
+        Index("ix_tasks_status_priority_rank_id", "status", "priority_rank", "id"),
+        Index("ix_tasks_status_end_date_id", "status", "end_date", "id"),
+        Index("ix_tasks_assigned_to_end_date_id", "assigned_to", "end_date", "id"),
+        Index("ix_tasks_assigned_to_status_id", "assigned_to", "status", "id"),
+    )
+
+    @validates("priority")
+    def _sync_priority_rank(self, key, value):
+        self.priority_rank = _rank(PRIORITY_RANKS, value)
+        return value
+
+    @validates("status")
+    def _sync_status_rank(self, key, value):
+        self.status_rank = _rank(STATUS_RANKS, value)
+        return value
 
     # IMPORTANT — this must exist BEFORE Comment tries to reference it
     comments = relationship(
         "Comment",
         back_populates="task",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="Comment.created_at",
     )
     attachments = relationship(
         "Attachment",
         back_populates="task",
         cascade="all, delete-orphan",
+        order_by="Attachment.uploaded_at",
     )
 
 
@@ -38,6 +92,10 @@ class Comment(Base):
     text = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_comments_task_id_created_at", "task_id", "created_at"),
+    )
+
     # reverse side
     task = relationship("Task", back_populates="comments")
 
@@ -53,10 +111,51 @@ class Attachment(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc)
     )
+    # hex SHA-256 of the content (the download ETag and the Blob holding
+    # it), byte size and MIME type
+    sha256 = Column(String(64), ForeignKey("blobs.sha256"), index=True)
+    size = Column(BigInteger)
+    content_type = Column(String(255))
+
+    __table_args__ = (
+        Index("ix_attachments_task_id_uploaded_at", "task_id", "uploaded_at"),
+    )
 
     task = relationship("Task", back_populates="attachments")
 
 
+class Blob(Base):
+    """
+    One stored file per distinct content, shared by every attachment with
+    that SHA-256 (see app/blobs.py). refcount is the number of attachments
+    pointing at it; blobs left at zero are removed by `app.cli gc-blobs`.
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    # last time refcount changed, so GC can leave recently released blobs alone
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+
+class TaskCounter(Base):
+    """
+    Running task counts per (dimension, value), kept in step by crud when
+    settings.TASK_STATS_COUNTERS is on. dimension is "total", "status",
+    "priority" or "assigned_to"; value is "" for the total and unassigned.
+    """
+    __tablename__ = "task_counters"
+
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -65,3 +164,15 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role = Column(String(20), nullable=False, default="user")  # "admin" or "user"
 
+
+
+class RevokedToken(Base):
+    """
+    jti of a token that must no longer be accepted. Rows can be purged once
+    expires_at has passed, since the token would be rejected anyway.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
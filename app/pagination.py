@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import date
+
+
+def encode_cursor(sort_by: str, order: str, value, last_id: int) -> str:
+    """Pack the last (sort value, id) pair of a page into an opaque token."""
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort_by, "o": order, "v": value, "id": last_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Unpack a cursor produced by encode_cursor.
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if not isinstance(data, dict) or not _is_int(data.get("id")):
+        raise ValueError("Invalid cursor")
+    # sort values are encoded as JSON strings (text, ISO dates), ints (ranks) or null
+    value = data.get("v")
+    if value is not None and not isinstance(value, str) and not _is_int(value):
+        raise ValueError("Invalid cursor")
+    return data
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
@@ -0,0 +1,203 @@
+"""
+Password hashing off the request threads.
+
+pbkdf2 is deliberately slow, and a burst of logins hashing inline would
+tie up the anyio threadpool that every sync route shares. Hashing and
+verification instead run in a small process pool of
+PASSWORD_HASH_WORKERS processes. Once PASSWORD_HASH_MAX_QUEUE calls are
+waiting behind the busy workers, new calls fail fast with
+PasswordHasherBusy, which the API turns into a 503.
+
+PASSWORD_HASH_WORKERS=0 hashes on the anyio threadpool as before.
+
+The cost of a hash is set by the PASSWORD_HASH_ROUNDS policy (pick it
+with `python -m app.cli calibrate-hash`). Login rehashes any stored hash
+whose rounds fall outside PASSWORD_HASH_MIN_ROUNDS..MAX_ROUNDS, so a new
+policy reaches existing users as they sign in.
+
+This module is imported by the worker processes, so it must stay free of
+database and app imports at module level.
+"""
+import asyncio
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class HashPolicy(NamedTuple):
+    """
+    pbkdf2_sha256 rounds for new hashes, and the range a stored hash may
+    fall in before login rehashes it (see PASSWORD_HASH_* settings).
+    """
+    rounds: int
+    min_rounds: int
+    max_rounds: int
+
+
+@lru_cache(maxsize=4)
+def _context(policy: HashPolicy):
+    # passlib is imported (and the context built) on the first hash or verify
+    from passlib.context import CryptContext
+
+    # 🔹 Use pbkdf2_sha256 instead of bcrypt
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=policy.rounds,
+        pbkdf2_sha256__min_rounds=policy.min_rounds,
+        pbkdf2_sha256__max_rounds=policy.max_rounds,
+    )
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash/verify calls are already queued."""
+
+
+def _sanitize_password(password: str) -> str:
+    """
+    Ensure password is a string. (No 72-byte limit now, but this is safe.)
+    """
+    if not isinstance(password, str):
+        password = str(password)
+    return password
+
+
+def hash_password_sync(password: str, policy: HashPolicy) -> str:
+    return _context(policy).hash(_sanitize_password(password))
+
+
+def verify_password_sync(plain_password: str, hashed_password: str, policy: HashPolicy) -> bool:
+    return _context(policy).verify(_sanitize_password(plain_password), hashed_password)
+
+
+def verify_and_update_sync(
+    plain_password: str, hashed_password: str, policy: HashPolicy
+) -> tuple[bool, str | None]:
+    return _context(policy).verify_and_update(_sanitize_password(plain_password), hashed_password)
+
+
+class _HashPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.limit = workers + max_queue
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        if workers > 0:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # the pool starts inside a running, threaded server: forking it
+            # would copy locks other threads hold, so workers come from a
+            # clean forkserver process (spawn where that is unavailable)
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method)
+            )
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                raise PasswordHasherBusy()
+            self.in_flight += 1
+
+        if self._executor is None:
+            try:
+                return await run_in_threadpool(fn, *args)
+            finally:
+                self._release()
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: _HashPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _HashPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from .database import settings
+
+                _pool = _HashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+    return _pool
+
+
+def current_policy() -> HashPolicy:
+    from .database import settings
+
+    rounds = settings.PASSWORD_HASH_ROUNDS
+    return HashPolicy(
+        rounds=rounds,
+        min_rounds=settings.PASSWORD_HASH_MIN_ROUNDS or rounds,
+        max_rounds=settings.PASSWORD_HASH_MAX_ROUNDS or rounds,
+    )
+
+
+async def hash_password(password: str) -> str:
+    """Hash on the pool. Raises PasswordHasherBusy when the queue is full."""
+    return await _get_pool().run(hash_password_sync, password, current_policy())
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify on the pool. Raises PasswordHasherBusy when the queue is full."""
+    return await _get_pool().run(
+        verify_password_sync, plain_password, hashed_password, current_policy()
+    )
+
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify on the pool and, if the stored hash is outside the current
+    policy, return a fresh hash of the same password to store instead.
+    Returns (ok, new_hash_or_None).
+    """
+    return await _get_pool().run(
+        verify_and_update_sync, plain_password, hashed_password, current_policy()
+    )
+
+
+def calibrate(target_ms: float, samples: int = 5) -> tuple[int, float]:
+    """
+    Pick pbkdf2_sha256 rounds so that one verify takes about target_ms on
+    this machine. Returns (rounds, measured_ms).
+    """
+    probe = HashPolicy(20_000, 1, 2**31 - 1)
+    hashed = hash_password_sync("calibration", probe)
+
+    def verify_ms(policy, hashed):
+        best = float("inf")
+        for _ in range(samples):
+            t0 = time.perf_counter()
+            verify_password_sync("calibration", hashed, policy)
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000
+
+    # pbkdf2 cost is linear in rounds: scale from the probe, then check
+    rounds = max(1000, int(round(probe.rounds * target_ms / verify_ms(probe, hashed), -3)))
+    policy = HashPolicy(rounds, 1, 2**31 - 1)
+    return rounds, verify_ms(policy, hash_password_sync("calibration", policy))
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
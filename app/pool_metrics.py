@@ -0,0 +1,141 @@
+"""
+Connection pool metrics for GET /metrics.
+
+Pool event listeners count connects, checkouts, checkins and
+invalidations and keep the checked-out gauge. SQLAlchemy has no event
+for the start of a checkout, so the time a request waits for a
+connection (including opening a new one) is measured by
+``TimedQueuePool`` (``TimedAsyncQueuePool`` for the async engine), the
+pool class the engines are created with.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+
+    def add(self, name: str, delta=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout took to its metrics."""
+
+    metrics: PoolMetrics | None = None
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.add("timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - t0)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for engines made by create_async_engine."""
+
+
+_engines = {}
+
+
+def install(engine, name: str = "primary") -> PoolMetrics:
+    """Attach metrics to engine's pool and list it in the /metrics output."""
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics = metrics
+
+    # listeners on the engine follow it across pool recreation
+    event.listen(engine, "connect", lambda *a: metrics.add("connects"))
+    event.listen(engine, "invalidate", lambda *a: metrics.add("invalidations"))
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(*args):
+        metrics.add("checkouts")
+        metrics.add("checked_out")
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(*args):
+        metrics.add("checkins")
+        metrics.add("checked_out", -1)
+
+    _engines[name] = (engine, metrics)
+    return metrics
+
+
+def _pool_gauges(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        "size": pool.size(),
+        "idle": pool.checkedin(),
+        # SQLAlchemy counts this negative while fewer than pool_size
+        # connections are open; the gauge is only the connections beyond it
+        "overflow": max(0, pool.overflow()),
+    }
+
+
+def render() -> str:
+    """Prometheus text exposition of every installed pool."""
+    lines = []
+
+    def sample(metric, kind, help_text, values):
+        lines.append(f"# HELP db_pool_{metric} {help_text}")
+        lines.append(f"# TYPE db_pool_{metric} {kind}")
+        for pool_name, value in values:
+            lines.append(f'db_pool_{metric}{{pool="{pool_name}"}} {value}')
+
+    snapshots = []
+    for pool_name, (engine, m) in _engines.items():
+        with m._lock:
+            snap = dict(vars(m))
+        snap.update(_pool_gauges(engine.pool))
+        snapshots.append((pool_name, snap))
+
+    def each(key):
+        return [(name, snap[key]) for name, snap in snapshots if key in snap]
+
+    sample("size", "gauge", "Configured pool_size.", each("size"))
+    sample("checked_out", "gauge", "Connections currently lent out.", each("checked_out"))
+    sample("idle", "gauge", "Connections idle in the pool.", each("idle"))
+    sample("overflow", "gauge", "Connections open beyond pool_size.", each("overflow"))
+    sample("connects_total", "counter", "New DBAPI connections opened.", each("connects"))
+    sample("checkouts_total", "counter", "Connections checked out.", each("checkouts"))
+    sample("checkins_total", "counter", "Connections returned.", each("checkins"))
+    sample("invalidations_total", "counter", "Connections invalidated.", each("invalidations"))
+    sample("timeouts_total", "counter", "Checkouts that hit pool_timeout.", each("timeouts"))
+    sample("wait_seconds_sum", "counter", "Time spent waiting for a connection.", each("wait_seconds"))
+    sample("wait_seconds_count", "counter", "Checkouts timed.", each("wait_count"))
+    sample("wait_seconds_max", "gauge", "Longest checkout wait.", each("wait_max"))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS lists read-only copies of the primary (comma
+separated). ``get_read_db`` / ``get_async_read_db`` hand out a session on
+the next replica in turn, or on the primary when none are configured.
+
+Replicas lag, so a client that has just written would not see its write
+on the next page load. After every successful write the
+StickyPrimaryMiddleware sets a short-lived cookie, and reads from a client
+carrying it go to the primary for READ_YOUR_WRITES_SECONDS. The cookie
+holds its expiry signed with the app's secret key, so a client can't pin
+itself to the primary for longer by editing it. Browsers only send it
+cross-origin on requests made with credentials: "include".
+
+Routing can be tried locally by pointing DATABASE_REPLICA_URLS at copies
+of the SQLite file: reads show the copy's rows until a write pins the
+client to the primary.
+"""
+import hashlib
+import hmac
+import itertools
+import math
+import time
+from functools import lru_cache
+
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import MutableHeaders
+
+from . import pool_metrics, tokens
+from .database import SessionLocal, _async_sessions, async_url, pool_options, settings
+
+PRIMARY_COOKIE = "tb_primary_until"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@lru_cache(maxsize=None)
+def replica_urls() -> tuple[str, ...]:
+    return tuple(url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip())
+
+
+@lru_cache(maxsize=None)
+def _replica_sessions():
+    """itertools.cycle over one sessionmaker per replica, or None."""
+    makers = []
+    for i, url in enumerate(replica_urls()):
+        engine = create_engine(url, poolclass=pool_metrics.TimedQueuePool, **pool_options())
+        pool_metrics.install(engine, f"replica{i}")
+        makers.append(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    return itertools.cycle(makers) if makers else None
+
+
+@lru_cache(maxsize=None)
+def _async_replica_sessions():
+    makers = []
+    for i, url in enumerate(replica_urls()):
+        engine = create_async_engine(
+            async_url(url), poolclass=pool_metrics.TimedAsyncQueuePool, **pool_options()
+        )
+        pool_metrics.install(engine.sync_engine, f"async-replica{i}")
+        makers.append(async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+    return itertools.cycle(makers) if makers else None
+
+
+def _signature(until_ms: str) -> str:
+    key = tokens.SECRET_KEY.encode()
+    return hmac.new(key, f"{PRIMARY_COOKIE}:{until_ms}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _primary_cookie(until: float) -> str:
+    """Cookie value pinning reads to the primary until `until` (a Unix time)."""
+    until_ms = str(int(until * 1000))
+    return f"{until_ms}.{_signature(until_ms)}"
+
+
+def _pinned_to_primary(request: Request) -> bool:
+    until_ms, _, signature = request.cookies.get(PRIMARY_COOKIE, "").partition(".")
+    if not until_ms.isdigit() or not hmac.compare_digest(signature, _signature(until_ms)):
+        return False
+    return int(until_ms) / 1000 > time.time()
+
+
+def get_read_db(request: Request):
+    replicas = _replica_sessions()
+    use_primary = replicas is None or _pinned_to_primary(request)
+    db = SessionLocal() if use_primary else next(replicas)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    replicas = _async_replica_sessions()
+    use_primary = replicas is None or _pinned_to_primary(request)
+    db = _async_sessions()() if use_primary else next(replicas)()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+class StickyPrimaryMiddleware:
+    """Pin a client's reads to the primary for a while after it writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in _SAFE_METHODS
+            or not replica_urls()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{PRIMARY_COOKIE}={_primary_cookie(time.time() + window)}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,161 @@
+"""
+Revoked-token list, checked on every authenticated request.
+
+The revoked_tokens table is the source of truth and is shared by every
+worker process. Each process keeps a Bloom filter of all unexpired
+revoked jtis in front of it, together with a set of jtis it has confirmed
+as revoked:
+
+* filter says "no"  -> not revoked, no query (almost every request)
+* jti in the set    -> revoked, no query
+* otherwise         -> possibly a filter false positive; one indexed
+                       lookup settles it
+
+New rows from other processes are folded into the filter at most every
+REVOCATION_SYNC_SECONDS, so a token revoked elsewhere is refused within
+that window. Revocations made by this process take effect at once. Ids
+are not committed in order (a lower id can land after a higher one), so
+each sync re-reads a trailing window of ids below the highest seen
+rather than starting strictly after it.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import settings
+
+# ids below the highest one seen that each sync reads again, to catch rows
+# whose transactions committed after a later id's; revocations commit
+# straight away, so a window this wide covers any realistic interleaving
+_RESCAN_IDS = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for capacity at error_rate."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self, capacity: int, sync_seconds: float):
+        self.sync_seconds = sync_seconds
+        self._capacity = capacity
+        self._bloom = BloomFilter(capacity)
+        self._revoked: set[str] = set()
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> int:
+        """Fold rows added since the last sync into the filter. Returns rows read."""
+        fetched = (
+            db.query(models.RevokedToken.id, models.RevokedToken.jti)
+            .filter(
+                models.RevokedToken.id > self._last_id - _RESCAN_IDS,
+                models.RevokedToken.expires_at > datetime.now(timezone.utc),
+            )
+            .order_by(models.RevokedToken.id)
+            .all()
+        )
+        with self._lock:
+            # this process's own revocations are in the filter already, but
+            # must still move the mark, or every sync reads them all again
+            self._last_id = max(self._last_id, max((row_id for row_id, _ in fetched), default=0))
+            rows = [jti for _, jti in fetched if jti not in self._bloom]
+            if self._bloom.count + len(rows) > self._bloom.capacity:
+                self._rebuild(db)
+                return len(fetched)
+            for jti in rows:
+                self._bloom.add(jti)
+        return len(fetched)
+
+    def _rebuild(self, db: Session):
+        # the filter is full: start over at a size that fits what is live now
+        live = (
+            db.query(models.RevokedToken.id, models.RevokedToken.jti)
+            .filter(models.RevokedToken.expires_at > datetime.now(timezone.utc))
+            .all()
+        )
+        self._capacity = max(self._capacity, 2 * len(live))
+        self._bloom = BloomFilter(self._capacity)
+        self._revoked.clear()
+        for row_id, jti in live:
+            self._bloom.add(jti)
+        self._last_id = max((row_id for row_id, _ in live), default=self._last_id)
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        with self._lock:
+            due = time.monotonic() >= self._next_sync
+            if due:
+                self._next_sync = time.monotonic() + self.sync_seconds
+        if due:
+            self._load(db)
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+            if jti in self._revoked:
+                return True
+        found = db.query(models.RevokedToken.id).filter(models.RevokedToken.jti == jti).first()
+        if found:
+            with self._lock:
+                self._revoked.add(jti)
+        return found is not None
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> int:
+        """
+        Record jti as revoked until expires_at. Commits. Returns the rows
+        inserted: 0 when it was already revoked, so a caller that must be
+        the only one to revoke a token (refresh) can tell it lost the race.
+        """
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        result = db.execute(
+            insert(models.RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=["jti"])
+        )
+        db.commit()
+        with self._lock:
+            self._bloom.add(jti)
+            self._revoked.add(jti)
+        return result.rowcount
+
+
+revoked = RevocationList(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_SYNC_SECONDS)
+
+
+def purge_expired(db: Session) -> int:
+    """Delete rows for tokens that have expired anyway. Returns rows removed."""
+    result = db.execute(
+        delete(models.RevokedToken).where(
+            models.RevokedToken.expires_at <= datetime.now(timezone.utc)
+        )
+    )
+    db.commit()
+    return result.rowcount
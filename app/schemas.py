@@ -1,4 +1,4 @@
-from pydantic import BaseModel , Field
+from pydantic import BaseModel , Field, ValidationError
 from datetime import date, datetime
 from enum import Enum
 
@@ -39,6 +39,40 @@ class TaskOut(TaskCreate):
     class Config:
         orm_mode = True
 
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+class BatchItemError(BaseModel):
+    index: int  # position in the request array
+    id: int | None = None
+    error: str
+
+def validation_message(exc: ValidationError) -> str:
+    """One-line summary of a ValidationError, for per-item error reports."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+class TaskBatchResult(BaseModel):
+    items: list[TaskOut]
+    errors: list[BatchItemError]
+
+class TaskBatchDeleteResult(BaseModel):
+    deleted: list[int]
+    errors: list[BatchItemError]
+
+class TaskSearchHit(BaseModel):
+    task: TaskOut
+    rank: float
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: dict[str, int]
+    by_priority: dict[str, int]
+    by_assignee: dict[str, int]
+    unassigned: int
+    due_soon: list[TaskOut]
+
 class CommentBase(BaseModel):
     text: str
     author: str | None = None
@@ -59,10 +93,19 @@ class AttachmentOut(BaseModel):
     filename: str
     filepath: str
     uploaded_at: datetime
+    size: int | None = None
+    content_type: str | None = None
 
     class Config:
         orm_mode = True
 
+class TaskDetail(TaskOut):
+    """TaskOut with optionally embedded children (GET /tasks/{id}?expand=...)."""
+    comments: list[CommentOut] | None = None
+    attachments: list[AttachmentOut] | None = None
+
+TASK_EXPANSIONS = {"comments", "attachments"}
+
 # ---------- USERS & AUTH ----------
 
 class UserBase(BaseModel):
@@ -85,6 +128,11 @@ class UserOut(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -0,0 +1,276 @@
+"""
+Full-text search over tasks.
+
+The index lives in a side table, ``task_search``, with one row per task
+covering task_name, description and the text of every comment:
+
+* Postgres: a weighted ``tsvector`` column with a GIN index.
+* SQLite:   an FTS5 virtual table whose rowid is the task id.
+
+Only Postgres and SQLite are supported; ``install`` raises RuntimeError
+for any other database, so ``migrate`` fails before the app can start.
+Migration 0007 creates the table and indexes tasks that are not in it yet
+(``backfill``). crud keeps the index in step on every write; ``reindex``
+rewrites every row (``python -m app.cli reindex-search``).
+"""
+import re
+
+from sqlalchemy import Integer, bindparam, column, text
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+
+_PG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS task_search (
+        task_id INTEGER PRIMARY KEY REFERENCES tasks(id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_task_search_document ON task_search USING GIN (document)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+        task_name, description, comments, tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+_PG_UPSERT = text(
+    """
+    INSERT INTO task_search (task_id, document)
+    VALUES (
+        :task_id,
+        setweight(to_tsvector('english', :task_name), 'A')
+        || setweight(to_tsvector('english', :description), 'B')
+        || setweight(to_tsvector('english', :comments), 'C')
+    )
+    ON CONFLICT (task_id) DO UPDATE SET document = EXCLUDED.document
+    """
+)
+
+_SQLITE_INSERT = text(
+    "INSERT INTO task_search (rowid, task_name, description, comments) "
+    "VALUES (:task_id, :task_name, :description, :comments)"
+)
+
+_DELETE = {
+    "postgresql": text("DELETE FROM task_search WHERE task_id = :task_id"),
+    "sqlite": text("DELETE FROM task_search WHERE rowid = :task_id"),
+}
+
+_MATCH = {
+    "postgresql": text(
+        "SELECT task_id FROM task_search WHERE document @@ to_tsquery('english', :query)"
+    ),
+    "sqlite": text("SELECT rowid AS task_id FROM task_search WHERE task_search MATCH :query"),
+}
+
+# task_name matches outrank description matches, which outrank comments.
+# ts_rank_cd is "higher is better"; FTS5 bm25 is "lower is better".
+_RANKED = {
+    "postgresql": text(
+        """
+        SELECT task_id, ts_rank_cd(document, to_tsquery('english', :query)) AS rank
+        FROM task_search
+        WHERE document @@ to_tsquery('english', :query)
+        ORDER BY rank DESC, task_id
+        LIMIT :limit OFFSET :offset
+        """
+    ),
+    "sqlite": text(
+        """
+        SELECT rowid, -bm25(task_search, 10.0, 5.0, 1.0) AS rank
+        FROM task_search
+        WHERE task_search MATCH :query
+        ORDER BY rank DESC, rowid
+        LIMIT :limit OFFSET :offset
+        """
+    ),
+}
+
+
+# tasks with no search row yet, and their comments, in plain SQL so the
+# migration that installs the index can run them whatever the models say
+_UNINDEXED = {
+    "postgresql": text(
+        "SELECT id, task_name, description FROM tasks t WHERE id > :after "
+        "AND NOT EXISTS (SELECT 1 FROM task_search s WHERE s.task_id = t.id) "
+        "ORDER BY id LIMIT :limit"
+    ),
+    "sqlite": text(
+        "SELECT id, task_name, description FROM tasks t WHERE id > :after "
+        "AND NOT EXISTS (SELECT 1 FROM task_search s WHERE s.rowid = t.id) "
+        "ORDER BY id LIMIT :limit"
+    ),
+}
+_COMMENTS = text(
+    "SELECT task_id, text FROM comments WHERE task_id IN :ids ORDER BY task_id, created_at"
+).bindparams(bindparam("ids", expanding=True))
+
+
+def _dialect(bind) -> str:
+    name = bind.dialect.name
+    if name not in _MATCH:
+        raise RuntimeError(
+            f"Full-text search needs PostgreSQL or SQLite, and the database is {name}"
+        )
+    return name
+
+
+def _write(db, params):
+    """Write search rows; takes a Session or a Connection (migrations)."""
+    bind = db.get_bind() if isinstance(db, Session) else db
+    if _dialect(bind) == "postgresql":
+        db.execute(_PG_UPSERT, params)
+    else:
+        db.execute(_DELETE["sqlite"], params)
+        db.execute(_SQLITE_INSERT, params)
+
+
+def install(conn):
+    """Create the search table/index on a connection (idempotent). Caller commits."""
+    ddl = _PG_DDL if _dialect(conn) == "postgresql" else _SQLITE_DDL
+    for stmt in ddl:
+        conn.execute(text(stmt))
+
+
+def build_query(bind, q: str) -> str | None:
+    """
+    Turn free user input into a prefix-matching query for the dialect.
+    Every word must match; returns None when q has no searchable words.
+    """
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return None
+    if _dialect(bind) == "postgresql":
+        return " & ".join(f"{w}:*" for w in words)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _document(task, comments: list[str]) -> dict:
+    return {
+        "task_id": task.id,
+        "task_name": task.task_name or "",
+        "description": task.description or "",
+        "comments": "\n".join(comments),
+    }
+
+
+def index_task(db: Session, task: models.Task):
+    """Write (or rewrite) the search row for a task. Caller commits."""
+    _write(db, _document(task, [c.text for c in task.comments]))
+
+
+def index_tasks(db: Session, tasks: list[models.Task], with_comments: bool = True):
+    """
+    Write the search rows for many tasks as one executemany. Comment text
+    is read with a single query; pass with_comments=False for new tasks.
+    Caller commits.
+    """
+    if not tasks:
+        return
+
+    comments = {}
+    if with_comments:
+        rows = (
+            db.query(models.Comment.task_id, models.Comment.text)
+            .filter(models.Comment.task_id.in_([t.id for t in tasks]))
+            .order_by(models.Comment.task_id, models.Comment.created_at)
+        )
+        for task_id, body in rows:
+            comments.setdefault(task_id, []).append(body)
+
+    _write(db, [_document(t, comments.get(t.id, [])) for t in tasks])
+
+
+def remove_task(db: Session, task_id: int):
+    """Drop the search row for a task. Caller commits."""
+    remove_tasks(db, [task_id])
+
+
+def remove_tasks(db: Session, task_ids: list[int]):
+    """Drop the search rows for several tasks. Caller commits."""
+    if task_ids:
+        db.execute(_DELETE[_dialect(db.get_bind())], [{"task_id": i} for i in task_ids])
+
+
+def match_clause(db: Session, q: str):
+    """
+    A filter for models.Task restricted to tasks matching q,
+    or None if q contains nothing searchable.
+    """
+    query = build_query(db.get_bind(), q)
+    if query is None:
+        return None
+    stmt = _MATCH[_dialect(db.get_bind())].bindparams(query=query)
+    return models.Task.id.in_(stmt.columns(column("task_id", Integer)))
+
+
+def search_tasks(db: Session, q: str, limit: int = 20, offset: int = 0):
+    """Return [(task, rank), ...] for q, best match first."""
+    query = build_query(db.get_bind(), q)
+    if query is None:
+        return []
+
+    hits = db.execute(
+        _RANKED[_dialect(db.get_bind())],
+        {"query": query, "limit": limit, "offset": offset},
+    ).all()
+    if not hits:
+        return []
+
+    tasks = {
+        t.id: t
+        for t in db.query(models.Task).filter(models.Task.id.in_([h[0] for h in hits]))
+    }
+    return [(tasks[task_id], rank) for task_id, rank in hits if task_id in tasks]
+
+
+def reindex(db: Session, batch_size: int = 500) -> int:
+    """Rewrite the search row of every task, one committed batch at a time."""
+    last_id = 0
+    total = 0
+    while True:
+        batch = (
+            db.query(models.Task)
+            .options(selectinload(models.Task.comments))
+            .filter(models.Task.id > last_id)
+            .order_by(models.Task.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return total
+
+        for task in batch:
+            index_task(db, task)
+        db.commit()
+
+        total += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
+
+
+def backfill(conn, batch_size: int = 500) -> int:
+    """
+    Index every task that has no search row yet, in id order, a batch at
+    a time. Runs on a Connection; caller commits. Returns tasks indexed.
+    """
+    unindexed = _UNINDEXED[_dialect(conn)]
+    last_id = 0
+    total = 0
+    while True:
+        batch = conn.execute(unindexed, {"after": last_id, "limit": batch_size}).all()
+        if not batch:
+            return total
+
+        comments = {}
+        for task_id, body in conn.execute(_COMMENTS, {"ids": [t.id for t in batch]}):
+            comments.setdefault(task_id, []).append(body)
+        _write(conn, [_document(t, comments.get(t.id, [])) for t in batch])
+
+        total += len(batch)
+        last_id = batch[-1].id
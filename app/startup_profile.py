@@ -0,0 +1,116 @@
+"""
+Start-up profiling for the API process.
+
+With STARTUP_PROFILE set, a worker records how long each boot phase took
+and, once the startup hooks have run, writes one JSON line to the path
+in STARTUP_PROFILE (or stderr for "1"):
+
+    {"phases_ms": {"imports": ..., "app setup": ..., "startup hooks": ...},
+     "total_ms": ..., "modules": ..., "eager_auth_modules": [...]}
+
+``profile`` boots a worker in a child process under ``-X importtime``
+with the profile on; ``python -m app.cli profile-startup`` prints both
+the phases and the slowest imports, failing if boot exceeds TARGET_MS or
+if an auth or crypto library was imported before it was needed, and
+tests/test_startup.py checks the same.
+
+This module is imported first by app.main and must stay dependency-free.
+"""
+import json
+import os
+import sys
+import time
+
+# boot budget for one worker on a developer machine, imports to ready
+TARGET_MS = 1500
+
+# heavy libraries that should only load on the first authenticated request
+AUTH_MODULES = ("jose", "passlib", "cryptography")
+
+# what `profile` times: importing the app and running its startup hooks
+_BOOT = (
+    "import app.main\n"
+    "from fastapi.testclient import TestClient\n"
+    "with TestClient(app.main.app):\n"
+    "    pass\n"
+)
+
+_last = time.perf_counter()
+_phases: dict[str, float] = {}
+
+
+def mark(phase: str):
+    """Close the current phase under this name."""
+    global _last
+    now = time.perf_counter()
+    _phases[phase] = (now - _last) * 1000
+    _last = now
+
+
+def resume():
+    """Start the next phase now; time since the last mark belongs to the server."""
+    global _last
+    _last = time.perf_counter()
+
+
+def report() -> dict:
+    return {
+        "phases_ms": {name: round(ms, 1) for name, ms in _phases.items()},
+        "total_ms": round(sum(_phases.values()), 1),
+        "modules": len(sys.modules),
+        "eager_auth_modules": [m for m in AUTH_MODULES if m in sys.modules],
+    }
+
+
+def write():
+    """Write the report where STARTUP_PROFILE points; no-op when it is unset."""
+    target = os.environ.get("STARTUP_PROFILE")
+    if not target:
+        return
+    line = json.dumps(report())
+    if target == "1":
+        print(line, file=sys.stderr)
+    else:
+        with open(target, "a") as f:
+            f.write(line + "\n")
+
+
+def profile() -> tuple[dict, str]:
+    """
+    Boot a worker in a child process: (its report, its -X importtime
+    output). Raises subprocess.CalledProcessError if the boot fails.
+    """
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "profile.json")
+        child = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _BOOT],
+            env=dict(os.environ, STARTUP_PROFILE=report_path),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        with open(report_path) as f:
+            return json.loads(f.readline()), child.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """[(module, self_us, cumulative_us), ...] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def top_level_packages(rows) -> list[tuple[str, int]]:
+    """Self time summed per top-level package, slowest first."""
+    totals: dict[str, int] = {}
+    for name, self_us, _ in rows:
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,208 @@
+"""
+Where attachment files live.
+
+``get_storage()`` returns the backend chosen by STORAGE_BACKEND:
+
+* ``local``: files under UPLOAD_DIR, for one node or a volume every node
+  mounts. Downloads are served by FileResponse (Range, If-Range, 206).
+* ``s3``: an S3-compatible bucket (AWS, MinIO, ...) named by S3_BUCKET,
+  with S3_ENDPOINT_URL / S3_REGION / S3_PREFIX and credentials from the
+  usual AWS environment variables or config files. Downloads redirect to
+  a presigned URL, so file bytes go from the bucket straight to the
+  client and the bucket answers Range requests itself. Needs boto3,
+  which is only imported when this backend is selected. gc-blobs refuses
+  to run without an S3_PREFIX, since the rest of the bucket may not be ours.
+
+Existing files are not moved by changing STORAGE_BACKEND: downloads of
+blobs the bucket lacks would redirect to keys that were never uploaded.
+To move an install from local to s3:
+
+1. with the S3_* settings and STORAGE_BACKEND=s3 in the environment of a
+   one-off shell, run ``python -m app.cli copy-blobs-to-storage``; the app
+   keeps serving from UPLOAD_DIR meanwhile;
+2. switch the app to STORAGE_BACKEND=s3 and restart it;
+3. run ``copy-blobs-to-storage`` again for files uploaded in between (it
+   skips every blob already in the bucket).
+
+UPLOAD_DIR can be cleared of ``blobs/`` and ``thumbs/`` afterwards;
+previews are made again in the bucket on first request.
+
+Keys are attachment file paths (``blobs/ab/<sha256>``). Uploads are
+always received into a local temp file first (app/uploads.py) and then
+``put``. Every method blocks; call them on the threadpool from async code.
+"""
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Iterator
+
+from .database import settings
+
+_CHUNK = 1024 * 1024
+
+
+class Storage(ABC):
+    """Interface of a storage backend."""
+
+    @abstractmethod
+    def put(self, tmp_path: str, key: str):
+        """Store a complete local file as `key`, consuming `tmp_path`."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether `key` is stored."""
+
+    @abstractmethod
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        """Stream the content of `key`."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove `key`; no error if it is already gone."""
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[tuple[str, int, float]]:
+        """(key, size, modified as a Unix time) for every key under `prefix` ("dir/")."""
+
+    def local_path(self, key: str) -> str | None:
+        """Path of `key` on this node's disk, if the backend has one."""
+        return None
+
+    def presigned_url(self, key: str, content_type: str, content_disposition: str) -> str | None:
+        """A time-limited URL the client can download `key` from directly, if supported."""
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, tmp_path: str, key: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while chunk := f.read(_CHUNK):
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> Iterator[tuple[str, int, float]]:
+        for dirpath, _, filenames in os.walk(self._path(prefix)):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                yield key, stat.st_size, stat.st_mtime
+
+    def local_path(self, key: str) -> str | None:
+        return self._path(key)
+
+
+class S3Storage(Storage):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        presign_seconds: int = 300,
+    ):
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(signature_version="s3v4"),
+        )
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_seconds = presign_seconds
+
+    def put(self, tmp_path: str, key: str):
+        try:
+            # content-addressed keys never change, so a blob already there
+            # needs no second upload
+            if not self.exists(key):
+                # multipart from disk for large files, never held in memory
+                self.client.upload_file(tmp_path, self.bucket, self.prefix + key)
+        finally:
+            os.unlink(tmp_path)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self._client_error as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+        try:
+            yield from body.iter_chunks(_CHUNK)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def list(self, prefix: str) -> Iterator[tuple[str, int, float]]:
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix + prefix
+        )
+        for page in pages:
+            for obj in page.get("Contents", []):
+                key = obj["Key"][len(self.prefix):]
+                yield key, obj["Size"], obj["LastModified"].timestamp()
+
+    def presigned_url(self, key: str, content_type: str, content_disposition: str) -> str | None:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.prefix + key,
+                "ResponseContentType": content_type,
+                "ResponseContentDisposition": content_disposition,
+            },
+            ExpiresIn=self.presign_seconds,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_storage() -> Storage:
+    """The configured backend, built once per process."""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.UPLOAD_DIR)
+    if settings.STORAGE_BACKEND == "s3":
+        if not settings.S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        return S3Storage(
+            settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            presign_seconds=settings.S3_PRESIGN_SECONDS,
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}")
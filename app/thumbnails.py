@@ -0,0 +1,201 @@
+"""
+Resized WebP previews of image attachments.
+
+After an image is uploaded, ``schedule`` queues its previews on a small
+thread pool; Pillow releases the GIL while it decodes, resizes and
+encodes, so the threads really run in parallel without tying up the
+request threadpool. Previews go to the same storage backend as the
+blob, at ``thumbs/<2 hex>/<sha256>/<width>.webp``, so attachments that
+share content share previews, and GC removes them with their blob.
+
+Requested widths are snapped to WIDTHS, which bounds the variants kept
+per image. A preview that is not ready when requested is made on the
+same pool and awaited. The pool accepts at most THUMBNAIL_WORKERS +
+THUMBNAIL_MAX_QUEUE jobs: past that, background jobs are dropped (the
+preview is made on first request instead) and requests raise
+ThumbnailerBusy. Needs Pillow, which the first job imports.
+"""
+import asyncio
+import importlib.util
+import math
+import os
+import tempfile
+import threading
+from functools import lru_cache
+
+from . import uploads
+from .database import settings
+from .storage import Storage
+
+THUMB_DIR = "thumbs"
+WIDTHS = (160, 320, 640)
+# previews are at most this many times taller than wide
+_MAX_ASPECT = 4
+_QUALITY = 80
+
+SOURCE_TYPES = {
+    "image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff",
+}
+
+
+class ThumbnailerBusy(Exception):
+    """Too many preview jobs are already queued."""
+
+
+class ThumbnailError(Exception):
+    """The attachment could not be decoded as an image."""
+
+
+@lru_cache(maxsize=1)
+def available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def supported(content_type: str | None) -> bool:
+    return available() and content_type in SOURCE_TYPES
+
+
+def snap(width: int) -> int:
+    """The smallest preview width at least `width` wide (or the largest)."""
+    return next((w for w in WIDTHS if w >= width), WIDTHS[-1])
+
+
+def key(sha256: str, width: int) -> str:
+    return f"{THUMB_DIR}/{sha256[:2]}/{sha256}/{width}.webp"
+
+
+def keys(sha256: str) -> list[str]:
+    return [key(sha256, width) for width in WIDTHS]
+
+
+def source_sha(storage_key: str) -> str | None:
+    """The blob a preview key was made from, or None for other keys."""
+    parts = storage_key.split("/")
+    if len(parts) == 4 and parts[0] == THUMB_DIR:
+        return parts[2]
+    return None
+
+
+def _open_source(storage: Storage, source_key: str):
+    """
+    (path, temp path to remove or None) of the original on local disk.
+    Temp files use the upload prefix so GC clears any a crash leaves behind.
+    """
+    path = storage.local_path(source_key)
+    if path is not None:
+        return path, None
+    fd, tmp = tempfile.mkstemp(dir=settings.UPLOAD_DIR, prefix=uploads.TEMP_PREFIX)
+    with os.fdopen(fd, "wb") as out:
+        for chunk in storage.iter_chunks(source_key):
+            out.write(chunk)
+    return tmp, tmp
+
+
+def render(storage: Storage, sha256: str, source_key: str, widths=WIDTHS):
+    """Make and store the previews of one blob that are not stored yet (blocking)."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    widths = sorted((w for w in widths if not storage.exists(key(sha256, w))), reverse=True)
+    if not widths:
+        return
+
+    path, tmp_source = _open_source(storage, source_key)
+    try:
+        with Image.open(path) as image:
+            # JPEGs decode straight to a reduced scale, far cheaper than full size
+            scale = widths[0] / image.width
+            image.draft("RGB", (widths[0], math.ceil(image.height * scale)))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+            for width in widths:
+                preview = image.copy()
+                preview.thumbnail((width, width * _MAX_ASPECT), Image.Resampling.LANCZOS)
+                fd, tmp = tempfile.mkstemp(dir=settings.UPLOAD_DIR, prefix=uploads.TEMP_PREFIX)
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        preview.save(out, "WEBP", quality=_QUALITY)
+                    storage.put(tmp, key(sha256, width))
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                    raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as exc:
+        raise ThumbnailError(str(exc)) from exc
+    finally:
+        if tmp_source is not None:
+            os.unlink(tmp_source)
+
+
+class _ThumbnailPool:
+    def __init__(self, workers: int, max_queue: int):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.limit = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._lock = threading.Lock()
+        # one job per blob at a time; later callers share the running one
+        self._jobs = {}
+
+    def submit(self, storage: Storage, sha256: str, source_key: str):
+        """The Future of this blob's job, or None when the pool is full."""
+        with self._lock:
+            job = self._jobs.get(sha256)
+            if job is not None:
+                return job
+            if len(self._jobs) >= self.limit:
+                return None
+            job = self._executor.submit(render, storage, sha256, source_key)
+            self._jobs[sha256] = job
+        job.add_done_callback(lambda _: self._done(sha256))
+        return job
+
+    def _done(self, sha256: str):
+        with self._lock:
+            self._jobs.pop(sha256, None)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: _ThumbnailPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ThumbnailPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _ThumbnailPool(settings.THUMBNAIL_WORKERS, settings.THUMBNAIL_MAX_QUEUE)
+    return _pool
+
+
+def schedule(storage: Storage, sha256: str, source_key: str, content_type: str | None):
+    """Queue the previews of a new upload if it is an image; dropped when the pool is full."""
+    if supported(content_type):
+        job = _get_pool().submit(storage, sha256, source_key)
+        if job is not None:
+            # failures surface on request; don't let the Future log them unseen
+            job.add_done_callback(lambda f: f.exception())
+
+
+async def ensure(storage: Storage, sha256: str, source_key: str, width: int) -> str:
+    """
+    Storage key of the `width` preview, making the previews first if
+    needed. Raises ThumbnailerBusy or ThumbnailError.
+    """
+    preview = key(sha256, width)
+    if await asyncio.to_thread(storage.exists, preview):
+        return preview
+    job = _get_pool().submit(storage, sha256, source_key)
+    if job is None:
+        raise ThumbnailerBusy()
+    await asyncio.wrap_future(job)
+    return preview
+
+
+def shutdown():
+    if _pool is not None:
+        _pool.shutdown()
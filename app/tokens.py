@@ -0,0 +1,103 @@
+"""
+Issuing and checking JWT access tokens.
+
+A client reuses the same bearer token for every request of a session, so
+``decode_token`` remembers the verified claims of recently seen tokens
+until their ``exp``, keyed by a SHA-256 digest of the token. A repeat
+request then costs a hash and a dict lookup instead of a signature check
+and claims parsing. TOKEN_CACHE_SIZE bounds the cache (0 disables it).
+
+python-jose and its cryptography backends are imported on first use, so
+a worker that never sees a token doesn't pay for them at start-up.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from .database import settings
+
+SECRET_KEY = "super-secret-key-change-this"
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60
+REFRESH_TOKEN_EXPIRE_DAYS = 14
+
+
+class InvalidToken(Exception):
+    """The token's signature, format or exp check failed."""
+
+
+def _encode(data: dict, token_type: str, expires_delta: timedelta) -> str:
+    from jose import jwt
+
+    to_encode = data.copy()
+    expire = datetime.utcnow() + expires_delta
+    # jti names the token in the revocation list
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "typ": token_type})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    return _encode(data, "access", expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+
+def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    return _encode(data, "refresh", expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+class TokenCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> dict | None:
+        with self._lock:
+            claims = self._entries.get(digest)
+            if claims is None or claims["exp"] <= time.time():
+                if claims is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return claims
+
+    def put(self, digest: bytes, claims: dict):
+        # tokens without a numeric exp are verified every time
+        if self.max_size <= 0 or not isinstance(claims.get("exp"), (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = claims
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Return the verified claims of token. Raises InvalidToken if the
+    signature or exp check fails. Treat the result as read-only.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = cache.get(digest)
+    if claims is None:
+        from jose import JWTError, jwt
+
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+        cache.put(digest, claims)
+    return claims
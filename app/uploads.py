@@ -0,0 +1,253 @@
+"""
+Streaming attachment uploads.
+
+Starlette's form parsing spools the whole request body before a route
+runs, so a size limit checked in the route comes too late and the file
+is written twice. ``receive_file`` parses the multipart body as it
+arrives instead: the single file part goes straight into a temp file in
+the upload directory, written on the threadpool so the event loop never
+waits on the disk, and the upload is abandoned as soon as it passes
+``max_bytes``. The content is hashed on the way through, so the SHA-256
+that names its blob (app/blobs.py) and serves as the download ETag costs
+no second read. Only a complete, fsynced file is handed back; the caller
+renames it into the blob store, which is atomic on the same filesystem,
+so a reader never sees a partial file.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+from typing import NamedTuple
+
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+# names of in-progress upload files, which GC clears out once stale
+TEMP_PREFIX = ".upload-"
+
+# file data is handed to the threadpool in blocks of this size rather than
+# once per (often tiny) network chunk
+_WRITE_BLOCK = 1024 * 1024
+
+# leading bytes of common formats, for files whose name has no known extension
+_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\x1aE\xdf\xa3", "video/webm"),
+    (b"PK\x03\x04", "application/zip"),
+)
+_GENERIC_TYPES = {"", "application/octet-stream", "binary/octet-stream"}
+
+
+class ReceivedFile(NamedTuple):
+    filename: str
+    # the complete temp file, in the upload directory; the caller moves it
+    # into the blob store or discards it
+    path: str
+    size: int
+    sha256: str
+    content_type: str
+
+
+class UploadError(Exception):
+    """The request body is not a usable single-file multipart upload."""
+
+
+class UploadTooLarge(UploadError):
+    """The file is larger than the configured limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File too large (max {max_bytes} bytes)")
+        self.max_bytes = max_bytes
+
+
+class _FilePart:
+    """Callbacks for MultipartParser that keep only the `field` file part."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.filename = None
+        self.content_type = None
+        self.buffer = bytearray()
+        self.done = False
+        self._in_file = False
+        self._headers = {}
+        self._name = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field(self, data, start, end):
+        self._name += data[start:end]
+
+    def _header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._in_file = (
+            not self.done and name == self.field and b"filename" in options
+        )
+        if self._in_file:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            content_type = self._headers.get(b"content-type")
+            self.content_type = content_type.decode("latin-1") if content_type else None
+
+    def _part_data(self, data, start, end):
+        if self._in_file:
+            self.buffer += data[start:end]
+
+    def _part_end(self):
+        if self._in_file:
+            self.done = True
+            self._in_file = False
+
+
+def detect_content_type(filename: str, head: bytes, declared: str | None = None) -> str:
+    """
+    MIME type of an upload: from its file name, else its leading bytes,
+    else whatever the client declared, else application/octet-stream.
+    """
+    guessed, _ = mimetypes.guess_type(filename)
+    if guessed:
+        return guessed
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, content_type in _SIGNATURES:
+        if head.startswith(magic):
+            return content_type
+    declared = (declared or "").split(";")[0].strip().lower()
+    return declared if declared not in _GENERIC_TYPES else "application/octet-stream"
+
+
+def describe_file(path: str, filename: str) -> tuple[str, int, str]:
+    """(sha256, size, content type) of a stored file, reading it once."""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(path, "rb") as f:
+        while block := f.read(_WRITE_BLOCK):
+            if not size:
+                head = block[:16]
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size, detect_content_type(filename, head)
+
+
+def safe_filename(filename: str) -> str:
+    """The client's file name without any directory part."""
+    name = os.path.basename(filename.replace("\\", "/")).strip()
+    return name or "upload"
+
+
+async def receive_file(
+    request: Request, upload_dir: str, max_bytes: int, field: str = "file"
+) -> ReceivedFile:
+    """
+    Stream the `field` file of a multipart request into a temp file in
+    `upload_dir`.
+    Raises UploadTooLarge past `max_bytes`, UploadError for a body without
+    that file; nothing is left on disk in either case.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data upload")
+
+    # a body already declared too big is refused before reading any of it
+    # (the allowance covers the multipart framing around the file)
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise UploadTooLarge(max_bytes)
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=TEMP_PREFIX)
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+
+    async def flush():
+        nonlocal size, head
+        if not size:
+            head = bytes(part.buffer[:16])
+        size += len(part.buffer)
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        await run_in_threadpool(_write, out, digest, bytes(part.buffer))
+        part.buffer.clear()
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if len(part.buffer) >= _WRITE_BLOCK or (part.done and part.buffer):
+                await flush()
+        parser.finalize()
+        if part.filename is None:
+            raise UploadError(f"No file in form field {field!r}")
+        if part.buffer:
+            await flush()
+
+        filename = safe_filename(part.filename)
+        await run_in_threadpool(_finish, out)
+        return ReceivedFile(
+            filename,
+            tmp_path,
+            size,
+            digest.hexdigest(),
+            detect_content_type(filename, head, part.content_type),
+        )
+    except FormParserError as exc:
+        await run_in_threadpool(_discard, out, tmp_path)
+        raise UploadError("Invalid multipart body") from exc
+    except BaseException:
+        await run_in_threadpool(_discard, out, tmp_path)
+        raise
+
+
+def _write(out, digest, block: bytes):
+    out.write(block)
+    digest.update(block)
+
+
+def _finish(out):
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+
+
+def _discard(out, tmp_path: str):
+    out.close()
+    discard(tmp_path)
+
+
+def discard(path: str):
+    """Remove a received file that was not stored (blocking)."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
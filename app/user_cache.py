@@ -0,0 +1,104 @@
+"""
+In-process cache of the users behind bearer tokens.
+
+get_current_user runs on every authenticated request, and all it needs is
+the user's id and role. The cache keeps a small snapshot of each recently
+seen user for USER_CACHE_TTL_SECONDS, evicting the least recently used
+entry once USER_CACHE_SIZE users are held (0 turns the cache off).
+
+Entries are dropped as soon as a users row is updated or deleted through
+the ORM; anything that changes users behind SQLAlchemy's back should call
+``invalidate``. Each worker process has its own cache, so a change made
+by another process is seen within one TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+
+from . import models
+from .database import settings
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """The parts of a User that authorization needs."""
+    id: int
+    username: str
+    role: str
+
+
+class UserCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, username: str) -> CachedUser | None:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: CachedUser):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user.username] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username: str | None = None):
+        """Forget one user, or everyone when username is None."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def snapshot(user: models.User) -> CachedUser:
+    return CachedUser(id=user.id, username=user.username, role=user.role)
+
+
+def invalidate(username: str | None = None):
+    cache.invalidate(username)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    cache.invalidate(target.username)
+    # a renamed user is still cached under the old name
+    for old in inspect(target).attrs.username.history.deleted:
+        cache.invalidate(old)
@@ -0,0 +1,65 @@
+"""
+Requests/sec on GET /auth/me with and without the verified-token cache.
+
+    python -m benchmarks.bench_auth_me [--requests 5000]
+
+Drives the app in-process through TestClient, so the numbers include the
+framework overhead every real request pays. Also times decode_token on
+its own. Runs against a throw-away SQLite file unless DATABASE_URL is
+already set.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _tmp = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import migrations, tokens  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def _requests_per_sec(client: TestClient, headers: dict, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client.get("/auth/me", headers=headers).raise_for_status()
+    return n / (time.perf_counter() - t0)
+
+
+def _decodes_per_sec(token: str, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        tokens.decode_token(token)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    size = tokens.cache.max_size or 4096
+    with TestClient(app) as client:
+        client.post("/auth/signup", json={"username": "bench", "password": "bench-password"})
+        token = client.post(
+            "/auth/login", data={"username": "bench", "password": "bench-password"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for label, max_size in (("no token cache", 0), ("token cache", size)):
+            tokens.cache.clear()
+            tokens.cache.max_size = max_size
+            _requests_per_sec(client, headers, 200)  # warm up
+            rps = _requests_per_sec(client, headers, args.requests)
+            dps = _decodes_per_sec(token, args.requests * 10)
+            print(f"{label:15} /auth/me {rps:8,.0f} req/s   decode_token {dps:10,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cold start of a worker process: importing app.main, getting the schema
+ready and serving the first request.
+
+    python -m benchmarks.bench_cold_start [--runs 5]
+
+Every run is a fresh interpreter on an already migrated database. The
+schema step is timed both ways: the version check workers now run, and
+the create_all plus search DDL every worker used to run at import.
+Runs against a throw-away SQLite file unless DATABASE_URL is already set.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+from app import migrations, search
+from app.database import Base, engine
+t1 = time.perf_counter()
+if sys.argv[1] == "check":
+    migrations.check(engine)
+else:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        search.install(conn)
+t2 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    t3 = time.perf_counter()
+    client.get("/tasks?limit=1").raise_for_status()
+    t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "schema": t2 - t1, "first request": t4 - t3}))
+"""
+
+
+def _median_ms(samples, phase):
+    return statistics.median(s[phase] for s in samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "migrate"], env=env, check=True, capture_output=True
+    )
+
+    for mode, label in (("create_all", "create_all at import (old)"), ("check", "version check")):
+        samples = []
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, "-c", _CHILD, mode],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        print(label)
+        for phase in samples[0]:
+            print(f"  {phase:15} {_median_ms(samples, phase):8.1f} ms (median of {args.runs})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Bulk import throughput: rows/s for importer.import_tasks on a generated file.
+
+    python -m benchmarks.bench_import [--rows 1000000] [--format csv] [--chunk-size 1000]
+
+Runs against a throw-away SQLite file unless DATABASE_URL is already set
+(point it at Postgres to measure the COPY path). --trace-memory reports
+peak Python memory to show it stays flat, at a large cost in speed.
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+if "DATABASE_URL" not in os.environ:
+    _tmp = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}"
+
+from app import importer, migrations  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+STATUSES = ["Considered", "Investigation", "Code Review"]
+PRIORITIES = ["Low", "Medium", "High", "Urgent"]
+
+
+def write_file(path: str, rows: int, fmt: str):
+    with open(path, "w", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["task_name", "status", "priority", "assigned_to", "end_date"])
+            for i in range(rows):
+                writer.writerow([
+                    f"imported task {i}", STATUSES[i % 3], PRIORITIES[i % 4],
+                    f"user{i % 50}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                ])
+        else:
+            for i in range(rows):
+                f.write(json.dumps({
+                    "task_name": f"imported task {i}", "status": STATUSES[i % 3],
+                    "priority": PRIORITIES[i % 4], "assigned_to": f"user{i % 50}",
+                }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=importer.FORMATS, default="csv")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--trace-memory", action="store_true", help="report peak Python memory (slow)")
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+
+    path = os.path.join(tempfile.mkdtemp(), f"tasks.{args.format}")
+    write_file(path, args.rows, args.format)
+    size_mb = os.path.getsize(path) / 1e6
+
+    db = SessionLocal()
+    if args.trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            for progress in importer.import_tasks(db, f, args.format, chunk_size=args.chunk_size):
+                pass
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - t0
+
+    print(f"{engine.dialect.name}: {progress['imported']} rows ({size_mb:.1f} MB {args.format}) "
+          f"in {elapsed:.1f}s = {progress['imported'] / elapsed:,.0f} rows/s")
+    if args.trace_memory:
+        print(f"peak Python memory {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
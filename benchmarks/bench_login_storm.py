@@ -0,0 +1,129 @@
+"""
+GET /tasks latency during a login storm, with password hashing on the
+request threadpool (PASSWORD_HASH_WORKERS=0) vs the dedicated pool.
+
+    python -m benchmarks.bench_login_storm [--logins 200] [--concurrency 64] [--workers 2]
+
+Each mode starts its own uvicorn server on a throw-away SQLite file,
+measures /tasks alone, then again while `concurrency` clients log in as
+fast as they can. Logins turned away with a 503 are counted, not retried.
+Needs uvicorn and httpx.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PASSWORD = "storm-password"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workers: int, db_path: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        PASSWORD_HASH_WORKERS=str(workers),
+    )
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "migrate"], env=env, check=True, capture_output=True
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base}/tasks?limit=1", timeout=1)
+            return proc, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        r = await client.get("/tasks?limit=20")
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def _storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> dict:
+    outcomes = {}
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            r = await client.post("/auth/login", data={"username": "storm", "password": PASSWORD})
+            outcomes[r.status_code] = outcomes.get(r.status_code, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+
+def _summary(latencies: list[float]) -> str:
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return f"p50 {statistics.median(ms):6.1f} ms  p99 {p99:6.1f} ms  ({len(ms)} requests)"
+
+
+async def _run(base: str, logins: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency + 8)
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as client:
+        await client.post("/auth/signup", json={"username": "storm", "password": PASSWORD})
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop))
+        await asyncio.sleep(2)
+        stop.set()
+        print(f"  /tasks idle:         {_summary(await probe)}")
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop))
+        t0 = time.perf_counter()
+        outcomes = await _storm(client, logins, concurrency)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        print(f"  /tasks during storm: {_summary(await probe)}")
+        print(f"  {logins} logins in {elapsed:.1f}s, status codes {dict(sorted(outcomes.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2, help="hash pool size for the pooled run")
+    args = parser.parse_args()
+
+    for workers in (0, args.workers):
+        label = "inline (threadpool)" if workers == 0 else f"process pool, {workers} workers"
+        print(label)
+        db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        proc, base = _start_server(workers, db_path)
+        try:
+            asyncio.run(_run(base, args.logins, args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Page 1 vs page 10,000 latency for GET /tasks: offset paging vs cursor paging.
+
+    python -m benchmarks.bench_pagination [--rows 600000] [--sort-by end_date]
+
+Runs against a throw-away SQLite file unless DATABASE_URL is already set.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    _tmp = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}"
+
+from app import crud, migrations, models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+PAGE_SIZE = 50
+
+
+def seed(rows: int):
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        if conn.execute(models.Task.__table__.select().limit(1)).first():
+            return
+        statuses = ["Considered", "Investigation", "Code Review"]
+        priorities = ["Low", "Medium", "High", "Urgent"]
+        start = date(2024, 1, 1)
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "task_name": f"task {i}",
+                "status": random.choice(statuses),
+                "priority": random.choice(priorities),
+                "end_date": start + timedelta(days=random.randint(0, 700)),
+            })
+            if len(batch) == 10_000:
+                conn.execute(models.Task.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(models.Task.__table__.insert(), batch)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=600_000)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--sort-by", default="id")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    db = SessionLocal()
+    try:
+        deep_offset = (args.page - 1) * PAGE_SIZE
+        # the cursor a client would hold after reading page-1 pages
+        prev = crud.list_tasks(db, sort_by=args.sort_by, offset=deep_offset - 1, limit=1)[0]
+        cursor = crud.task_cursor(prev, args.sort_by)
+
+        results = {
+            "offset page 1": timed(lambda: crud.list_tasks(db, sort_by=args.sort_by, limit=PAGE_SIZE)),
+            f"offset page {args.page}": timed(
+                lambda: crud.list_tasks(db, sort_by=args.sort_by, limit=PAGE_SIZE, offset=deep_offset)
+            ),
+            f"cursor page {args.page}": timed(
+                lambda: crud.list_tasks(db, sort_by=args.sort_by, limit=PAGE_SIZE, cursor=cursor)
+            ),
+        }
+        deep_by_offset = crud.list_tasks(db, sort_by=args.sort_by, limit=PAGE_SIZE, offset=deep_offset)
+        deep_by_cursor = crud.list_tasks(db, sort_by=args.sort_by, limit=PAGE_SIZE, cursor=cursor)
+        assert [t.id for t in deep_by_offset] == [t.id for t in deep_by_cursor]
+    finally:
+        db.close()
+
+    print(f"sort_by={args.sort_by} rows={args.rows} page_size={PAGE_SIZE}")
+    for name, ms in results.items():
+        print(f"  {name:<22} {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
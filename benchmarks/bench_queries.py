@@ -0,0 +1,122 @@
+"""
+Per-call cost of the hot crud reads: the legacy Query the functions used
+to build on every call vs the prebuilt statements they execute now.
+
+    python -m benchmarks.bench_queries [--calls 5000]
+
+Each query is also timed as raw SQL through the DBAPI cursor, so the gap
+to that floor is the ORM's per-call overhead. Runs against a throw-away
+SQLite file unless DATABASE_URL is already set.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _tmp = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}"
+
+from app import crud, migrations, models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+
+def _legacy_list_tasks(db, status=None, assigned_to=None, limit=50, offset=0):
+    query = db.query(models.Task)
+    if status:
+        query = query.filter(models.Task.status == status)
+    if assigned_to:
+        query = query.filter(models.Task.assigned_to == assigned_to)
+    return query.order_by(models.Task.id.asc()).offset(offset).limit(limit).all()
+
+
+def _cases(db, task_id: int, attachment_id: int):
+    """{name: (legacy call, current call, raw SQL, raw params)}"""
+    return {
+        "get_task": (
+            lambda: db.query(models.Task).filter(models.Task.id == task_id).first(),
+            lambda: crud.get_task(db, task_id),
+            "SELECT * FROM tasks WHERE id = ?",
+            (task_id,),
+        ),
+        "get_attachment": (
+            lambda: db.query(models.Attachment)
+            .filter(models.Attachment.id == attachment_id)
+            .first(),
+            lambda: crud.get_attachment(db, attachment_id),
+            "SELECT * FROM attachments WHERE id = ?",
+            (attachment_id,),
+        ),
+        "get_user_by_username": (
+            lambda: db.query(models.User).filter(models.User.username == "bench").first(),
+            lambda: crud.get_user_by_username(db, "bench"),
+            "SELECT * FROM users WHERE username = ?",
+            ("bench",),
+        ),
+        "list_tasks(status, assignee)": (
+            lambda: _legacy_list_tasks(db, status="Investigation", assigned_to="user1", limit=20),
+            lambda: crud.list_tasks(db, status="Investigation", assigned_to="user1", limit=20),
+            "SELECT * FROM tasks WHERE status = ? AND assigned_to = ? "
+            "ORDER BY id LIMIT 20 OFFSET 0",
+            ("Investigation", "user1"),
+        ),
+    }
+
+
+def _us_per_call(fn, calls: int) -> float:
+    for _ in range(calls // 10):
+        fn()
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def _seed(db) -> tuple[int, int]:
+    tasks = crud.create_tasks(db, [
+        schemas.TaskCreate(
+            task_name=f"bench task {i}",
+            status=["Considered", "Investigation"][i % 2],
+            assigned_to=f"user{i % 10}",
+        )
+        for i in range(200)
+    ])
+    crud.create_user(db, schemas.UserCreate(username="bench", password="bench-password"), "x")
+    att = crud.add_attachment(db, tasks[0].id, "bench.txt", "0" * 64, 0, "text/plain")
+    return tasks[0].id, att.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    task_id, attachment_id = _seed(db)
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    sqlite = engine.dialect.name == "sqlite"
+
+    print(f"{'':30} {'legacy':>10} {'now':>10} {'raw SQL':>10}   ORM overhead (us/call)")
+    for name, (legacy, current, sql, params) in _cases(db, task_id, attachment_id).items():
+        if not sqlite:
+            sql = sql.replace("?", "%s")
+
+        def raw_call():
+            cursor.execute(sql, params)
+            cursor.fetchall()
+
+        old = _us_per_call(legacy, args.calls)
+        new = _us_per_call(current, args.calls)
+        floor = _us_per_call(raw_call, args.calls)
+        print(
+            f"{name:30} {old:8.1f}us {new:8.1f}us {floor:8.1f}us   "
+            f"{old - floor:7.1f} -> {new - floor:7.1f}"
+        )
+    raw.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
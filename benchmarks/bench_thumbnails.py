@@ -0,0 +1,147 @@
+"""
+Weight of a task page with image attachments: originals vs previews.
+
+    python -m benchmarks.bench_thumbnails [--images 12] [--width 160]
+
+Starts a uvicorn server on a throw-away SQLite file and UPLOAD_DIR,
+uploads `images` generated photo-sized JPEGs (plus the sample wallpapers
+in app/uploads, if any) to one task, then loads the task page the way
+the browser does: the task with its attachments, then every image,
+six requests at a time. "originals" fetches each /attachments/{id} as
+the page would without previews; "previews" fetches
+/attachments/{id}/thumb?w=`width` right after the uploads (cold: made
+on demand or by the background job) and again once they exist (warm).
+Needs uvicorn, httpx and Pillow.
+"""
+import argparse
+import asyncio
+import glob
+import io
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from PIL import Image, ImageFilter
+
+SAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, "app", "uploads", "*.jpg")
+# connections a browser opens per host
+BROWSER_CONNECTIONS = 6
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workdir: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+    )
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "migrate"], env=env, check=True, capture_output=True
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base}/tasks?limit=1", timeout=1)
+            return proc, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def _photo(seed: int) -> bytes:
+    """A 4000x3000 JPEG with photo-like detail (blurred noise over a gradient)."""
+    noise = Image.effect_noise((1000, 750), 64 + seed % 32).filter(ImageFilter.GaussianBlur(1))
+    gradient = Image.linear_gradient("L").resize((1000, 750)).rotate(seed * 37 % 360)
+    image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    buf = io.BytesIO()
+    image.resize((4000, 3000), Image.Resampling.BICUBIC).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def _load_page(client: httpx.AsyncClient, task_id: int, urls: list[str]) -> tuple[float, int]:
+    """(seconds, bytes) to fetch the task and then `urls` over browser-like connections."""
+    limit = asyncio.Semaphore(BROWSER_CONNECTIONS)
+
+    async def fetch(url: str) -> int:
+        async with limit:
+            r = await client.get(url, follow_redirects=True)
+            r.raise_for_status()
+            return len(r.content)
+
+    t0 = time.perf_counter()
+    total = await fetch(f"/tasks/{task_id}?expand=attachments")
+    total += sum(await asyncio.gather(*(fetch(url) for url in urls)))
+    return time.perf_counter() - t0, total
+
+
+async def _run(base: str, images: int, width: int):
+    async with httpx.AsyncClient(base_url=base, timeout=600) as client:
+        admin = {"username": "bench", "password": "bench-password", "role": "admin"}
+        await client.post("/auth/signup", json=admin)
+        token = (await client.post("/auth/login", data=admin)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        task_id = (await client.post("/tasks", json={"task_name": "thumbnail bench"})).json()["id"]
+
+        files = [(f"photo-{i}.jpg", _photo(i)) for i in range(images)]
+        for path in sorted(glob.glob(SAMPLES)):
+            with open(path, "rb") as f:
+                files.append((os.path.basename(path), f.read()))
+
+        ids = []
+        t0 = time.perf_counter()
+        for name, content in files:
+            r = await client.post(
+                f"/tasks/{task_id}/attachments", files={"file": (name, content, "image/jpeg")}
+            )
+            r.raise_for_status()
+            ids.append(r.json()["id"])
+        print(
+            f"uploaded {len(files)} images ({sum(len(c) for _, c in files) / 1e6:.1f} MB) "
+            f"in {time.perf_counter() - t0:.1f}s"
+        )
+
+        originals = [f"/attachments/{i}" for i in ids]
+        previews = [f"/attachments/{i}/thumb?w={width}" for i in ids]
+        for label, urls in (
+            ("originals", originals),
+            ("previews (cold)", previews),
+            ("previews (warm)", previews),
+        ):
+            elapsed, size = await _load_page(client, task_id, urls)
+            print(f"{label:16} {size / 1e6:8.2f} MB  {elapsed * 1000:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--width", type=int, default=160)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    proc, base = _start_server(workdir)
+    try:
+        asyncio.run(_run(base, args.images, args.width))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
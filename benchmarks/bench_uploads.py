@@ -0,0 +1,148 @@
+"""
+GET /tasks latency while large attachments upload concurrently.
+
+    python -m benchmarks.bench_uploads [--uploads 16] [--concurrency 8] [--size-mb 50]
+
+Starts a uvicorn server on a throw-away SQLite file, measures /tasks
+alone, then again while `concurrency` clients each stream uploads of
+`size_mb` MB. With the upload path off the event loop the probe should
+barely move. Uploads go to a throw-away UPLOAD_DIR. Needs uvicorn and httpx.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BOUNDARY = "bench-boundary"
+_BLOCK = b"x" * (1024 * 1024)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workdir: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+    )
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "migrate"], env=env, check=True, capture_output=True
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base}/tasks?limit=1", timeout=1)
+            return proc, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def _multipart(size_mb: int):
+    yield (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; '
+        f'filename="bench.bin"\r\nContent-Type: application/octet-stream\r\n\r\n'
+    ).encode()
+    for _ in range(size_mb):
+        yield _BLOCK
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        r = await client.get("/tasks?limit=20")
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def _upload_all(client: httpx.AsyncClient, task_id: int, uploads: int, concurrency: int, size_mb: int):
+    outcomes = {}
+    remaining = iter(range(uploads))
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+    async def worker():
+        for _ in remaining:
+            r = await client.post(
+                f"/tasks/{task_id}/attachments", content=_multipart(size_mb), headers=headers
+            )
+            outcomes[r.status_code] = outcomes.get(r.status_code, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+
+def _summary(latencies: list[float]) -> str:
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return f"p50 {statistics.median(ms):6.1f} ms  p99 {p99:6.1f} ms  ({len(ms)} requests)"
+
+
+async def _run(base: str, uploads: int, concurrency: int, size_mb: int):
+    limits = httpx.Limits(max_connections=concurrency + 8)
+    async with httpx.AsyncClient(base_url=base, timeout=600, limits=limits) as client:
+        admin = {"username": "bench", "password": "bench-password", "role": "admin"}
+        await client.post("/auth/signup", json=admin)
+        token = (await client.post("/auth/login", data=admin)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        task_id = (await client.post("/tasks", json={"task_name": "upload bench"})).json()["id"]
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop))
+        await asyncio.sleep(2)
+        stop.set()
+        print(f"/tasks idle:           {_summary(await probe)}")
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop))
+        t0 = time.perf_counter()
+        outcomes = await _upload_all(client, task_id, uploads, concurrency, size_mb)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        print(f"/tasks during uploads: {_summary(await probe)}")
+        print(
+            f"{uploads} x {size_mb} MB uploads in {elapsed:.1f}s "
+            f"({uploads * size_mb / elapsed:.0f} MB/s), status codes {dict(sorted(outcomes.items()))}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    proc, base = _start_server(workdir)
+    try:
+        asyncio.run(_run(base, args.uploads, args.concurrency, args.size_mb))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,7 @@ function App() {
 
   // tasks + ui
   const [tasks, setTasks] = useState([]);
+  const [stats, setStats] = useState(null);
   const [loadingTasks, setLoadingTasks] = useState(false);
   const [err, setErr] = useState("");
 
@@ -73,16 +74,19 @@ function App() {
     } else {
       setTasks([]);
     }
-  }, [user]);
+  }, [user, sortBy]);
 
   async function loadTasks() {
     try {
       setErr("");
       setLoadingTasks(true);
-      const res = await fetch(`${API}/tasks`);
+      // the server ranks priority by severity, so that order holds past one page
+      const params = sortBy === "priority" ? "?sort_by=priority&order=desc" : "";
+      const res = await fetch(`${API}/tasks${params}`, { credentials: "include" });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
       const data = await res.json();
       setTasks(data);
+      await loadStats();
     } catch (e) {
       setErr(e.message || "Failed to load tasks");
     } finally {
@@ -90,6 +94,17 @@ function App() {
     }
   }
 
+  // header numbers come from the server so they cover every task, not one page
+  async function loadStats() {
+    try {
+      const res = await fetch(`${API}/tasks/stats`, { credentials: "include" });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      setStats(await res.json());
+    } catch (e) {
+      console.warn("Unable to load task stats", e);
+    }
+  }
+
   const switchAuthMode = (mode) => {
     setAuthMode(mode);
     setErr("");
@@ -117,6 +132,7 @@ function App() {
     body.append("grant_type", "password");
 
     const res = await fetch(`${API}/auth/login`, {
+      credentials: "include",
       method: "POST",
       headers: { "Content-Type": "application/x-www-form-urlencoded" },
       body,
@@ -138,6 +154,7 @@ function App() {
     if (!accessToken) throw new Error("No access token received");
 
     const meRes = await fetch(`${API}/auth/me`, {
+      credentials: "include",
       headers: {
         Authorization: `Bearer ${accessToken}`,
       },
@@ -181,6 +198,7 @@ function App() {
       }
 
       const res = await fetch(`${API}/auth/signup`, {
+        credentials: "include",
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -245,6 +263,7 @@ function App() {
       if (token) headers["Authorization"] = `Bearer ${token}`;
 
       const res = await fetch(`${API}/tasks`, {
+        credentials: "include",
         method: "POST",
         headers,
         body: JSON.stringify(body),
@@ -254,6 +273,7 @@ function App() {
 
       const created = await res.json();
       setTasks((cur) => [created, ...cur]);
+      loadStats();
 
       setForm({
         task_name: "",
@@ -298,6 +318,7 @@ function App() {
       if (token) headers["Authorization"] = `Bearer ${token}`;
 
       const res = await fetch(`${API}/tasks/${editId}`, {
+        credentials: "include",
         method: "PATCH",
         headers,
         body: JSON.stringify(body),
@@ -308,6 +329,7 @@ function App() {
       const updated = await res.json();
       setTasks((cur) => cur.map((t) => (t.id === updated.id ? updated : t)));
       setEditId(null);
+      loadStats();
     } catch (e) {
       setErr(e.message || "Failed to update task");
     }
@@ -322,6 +344,7 @@ function App() {
       if (token) headers["Authorization"] = `Bearer ${token}`;
 
       const res = await fetch(`${API}/tasks/${id}`, {
+        credentials: "include",
         method: "DELETE",
         headers,
       });
@@ -330,6 +353,7 @@ function App() {
 
       setTasks((cur) => cur.filter((t) => t.id !== id));
       if (editId === id) setEditId(null);
+      loadStats();
     } catch (e) {
       setErr(e.message || "Failed to delete task");
     }
@@ -361,13 +385,8 @@ function App() {
       return haystack.includes(normalizedQuery);
     })
     .sort((a, b) => {
-      if (sortBy === "priority") {
-        const order = { Urgent: 0, High: 1, Medium: 2, Low: 3 };
-        return (
-          (order[a.priority ?? "Medium"] ?? 99) -
-          (order[b.priority ?? "Medium"] ?? 99)
-        );
-      }
+      // already in severity order from the server; sort() is stable
+      if (sortBy === "priority") return 0;
 
       const dateA = new Date(a.created_at || a.end_date || a.start_date || 0);
       const dateB = new Date(b.created_at || b.end_date || b.start_date || 0);
@@ -378,15 +397,14 @@ function App() {
       return dateB - dateA;
     });
 
-  const activeCount = tasks.filter((t) =>
-    ACTIVE_STATUSES.includes(t.status)
-  ).length;
-  const completedCount = tasks.filter(
-    (t) => t.status === "Development Completed"
-  ).length;
-  const urgentCount = tasks.filter(
-    (t) => (t.priority ?? "Medium") === "Urgent"
-  ).length;
+  const statusCount = (status) => stats?.by_status?.[status] ?? 0;
+  const activeCount = ACTIVE_STATUSES.reduce(
+    (sum, status) => sum + statusCount(status),
+    0
+  );
+  const completedCount = statusCount("Development Completed");
+  const urgentCount = stats?.by_priority?.Urgent ?? 0;
+  const totalCount = stats?.total ?? tasks.length;
 
   const myTasks = useMemo(() => {
     if (!user) return [];
@@ -397,16 +415,7 @@ function App() {
     );
   }, [tasks, user]);
 
-  const upcomingTasks = useMemo(() => {
-    return [...tasks]
-      .filter((t) => t.end_date)
-      .sort((a, b) => {
-        const aDate = new Date(a.end_date ?? 0).getTime();
-        const bDate = new Date(b.end_date ?? 0).getTime();
-        return aDate - bDate;
-      })
-      .slice(0, 4);
-  }, [tasks]);
+  const upcomingTasks = stats?.due_soon ?? [];
 
   // ---------- LOGIN SCREEN ----------
   if (!user) {
@@ -617,7 +626,7 @@ function App() {
                 <div className="home-stats">
                   <SummaryCard
                     label="Total tasks"
-                    value={tasks.length}
+                    value={totalCount}
                     subtext="Across every swim lane"
                     accent="violet"
                   />
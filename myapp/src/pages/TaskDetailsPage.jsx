@@ -3,6 +3,16 @@ import { useNavigate, useParams } from "react-router-dom";
 
 const API = "http://127.0.0.1:8000";
 
+// types the API makes WebP previews of (app/thumbnails.py)
+const PREVIEW_TYPES = new Set([
+  "image/jpeg",
+  "image/png",
+  "image/webp",
+  "image/gif",
+  "image/bmp",
+  "image/tiff",
+]);
+
 export default function TaskDetailsPage() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -32,17 +42,21 @@ export default function TaskDetailsPage() {
     }
   }, []);
 
+  // one request for the task plus its comments and attachments
   const loadTask = useCallback(async () => {
-    const res = await fetch(`${API}/tasks/${id}`);
+    const res = await fetch(`${API}/tasks/${id}?expand=comments,attachments`, { credentials: "include" });
     if (!res.ok) throw new Error("Failed to load task");
-    const data = await res.json();
+    const { comments: taskComments, attachments: taskAttachments, ...data } =
+      await res.json();
     setTask(data);
     setDesc(data.description || "");
+    setComments(taskComments ?? []);
+    setAttachments(taskAttachments ?? []);
     return data;
   }, [id]);
 
   const loadAttachments = useCallback(async () => {
-    const res = await fetch(`${API}/tasks/${id}/attachments`);
+    const res = await fetch(`${API}/tasks/${id}/attachments`, { credentials: "include" });
     if (!res.ok) throw new Error("Failed to load attachments");
     const data = await res.json();
     setAttachments(data);
@@ -50,7 +64,7 @@ export default function TaskDetailsPage() {
   }, [id]);
 
   const loadComments = useCallback(async () => {
-    const res = await fetch(`${API}/tasks/${id}/comments`);
+    const res = await fetch(`${API}/tasks/${id}/comments`, { credentials: "include" });
     if (!res.ok) throw new Error("Failed to load comments");
     const data = await res.json();
     setComments(data);
@@ -68,22 +82,9 @@ export default function TaskDetailsPage() {
       } catch (error) {
         if (!cancelled) {
           setErr(error.message || "Failed to load task data");
-          setLoading(false);
         }
-        return;
       }
 
-      await Promise.allSettled([
-        loadAttachments().catch(
-          (error) =>
-            !cancelled && console.warn("Attachments failed to load", error)
-        ),
-        loadComments().catch(
-          (error) =>
-            !cancelled && console.warn("Comments failed to load", error)
-        ),
-      ]);
-
       if (!cancelled) {
         setLoading(false);
       }
@@ -94,7 +95,7 @@ export default function TaskDetailsPage() {
     return () => {
       cancelled = true;
     };
-  }, [loadTask, loadAttachments, loadComments]);
+  }, [loadTask]);
 
   async function saveDescription() {
     setSavingDesc(true);
@@ -105,6 +106,7 @@ export default function TaskDetailsPage() {
       if (token) headers["Authorization"] = `Bearer ${token}`;
 
       const res = await fetch(`${API}/tasks/${id}`, {
+        credentials: "include",
         method: "PATCH",
         headers,
         body: JSON.stringify({ description: desc || null }),
@@ -132,6 +134,7 @@ export default function TaskDetailsPage() {
       form.append("file", file);
 
       const res = await fetch(`${API}/tasks/${id}/attachments`, {
+        credentials: "include",
         method: "POST",
         body: form,
       });
@@ -154,6 +157,7 @@ export default function TaskDetailsPage() {
     setErr("");
     try {
       const res = await fetch(`${API}/tasks/${id}/comments`, {
+        credentials: "include",
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -284,7 +288,18 @@ export default function TaskDetailsPage() {
                 <ul className="attachment-list">
                   {attachments.map((att) => (
                     <li key={att.id} className="attachment-item">
-                      <div>
+                      {PREVIEW_TYPES.has(att.content_type) && (
+                        <a href={`${API}/attachments/${att.id}`} target="_blank" rel="noreferrer">
+                          <img
+                            className="attachment-thumb"
+                            src={`${API}/attachments/${att.id}/thumb?w=160`}
+                            alt={att.filename}
+                            loading="lazy"
+                            decoding="async"
+                          />
+                        </a>
+                      )}
+                      <div className="attachment-meta">
                         <strong>{att.filename}</strong>
                         <span>{fmtDateTime(att.uploaded_at)}</span>
                       </div>
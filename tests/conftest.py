@@ -0,0 +1,71 @@
+"""
+Shared fixtures. The app reads its settings at import time, so the
+environment is pointed at a throw-away SQLite file and UPLOAD_DIR before
+anything from ``app`` is imported; the schema is built once per run with
+the real migrations.
+"""
+import os
+import tempfile
+import uuid
+
+_WORKDIR = tempfile.mkdtemp(prefix="taskboard-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}",
+    UPLOAD_DIR=os.path.join(_WORKDIR, "uploads"),
+    # hash on the calling thread: no worker processes to start per run
+    PASSWORD_HASH_WORKERS="0",
+    PASSWORD_HASH_ROUNDS="1000",
+    STORAGE_BACKEND="local",
+    DATABASE_REPLICA_URLS="",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import migrations  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrations.upgrade(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def sign_in(client):
+    """
+    Sign a new user up and in: returns the token pair, and the client sends
+    its access token from then on.
+    """
+    def sign_in(role: str = "admin") -> dict:
+        user = {"username": f"user-{uuid.uuid4().hex[:12]}", "password": "test-password", "role": role}
+        client.post("/auth/signup", json=user).raise_for_status()
+        pair = client.post("/auth/login", data=user).json()
+        client.headers["Authorization"] = f"Bearer {pair['access_token']}"
+        return pair
+
+    return sign_in
+
+
+@pytest.fixture
+def admin(client, sign_in):
+    """A client signed in as a new admin."""
+    sign_in()
+    return client
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_refresh_token_is_single_use(client, sign_in):
+    pair = sign_in()
+    first = client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+    assert first.status_code == 200
+
+    again = client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+    assert again.status_code == 401
+
+
+def test_concurrent_refreshes_have_one_winner(client, sign_in):
+    pair = sign_in()
+
+    def refresh(_):
+        return client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(refresh, range(8)))
+    assert sorted(codes) == [200] + [401] * 7
+
+
+def test_access_token_is_refused_after_logout(client, sign_in):
+    pair = sign_in()
+    assert client.get("/auth/me").status_code == 200
+
+    out = client.post("/auth/logout", json={"refresh_token": pair["refresh_token"]})
+    assert out.status_code == 204
+    assert client.get("/auth/me").status_code == 401
+    refresh = client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+    assert refresh.status_code == 401
@@ -0,0 +1,45 @@
+import hashlib
+import os
+
+from app import blobs, crud, models, schemas, storage
+
+
+def _original(upload_dir, name: str) -> tuple[str, bytes]:
+    content = os.urandom(64)
+    (upload_dir / name).write_bytes(content)
+    return hashlib.sha256(content).hexdigest(), content
+
+
+def _store_blob(db, local, upload_dir, sha: str, content: bytes):
+    tmp = upload_dir / "staged"
+    tmp.write_bytes(content)
+    blobs.acquire(db, sha, len(content))
+    blobs.store(local, str(tmp), sha)
+
+
+def test_purge_originals(db, tmp_path):
+    local = storage.LocalStorage(str(tmp_path))
+    task = crud.create_task(db, schemas.TaskCreate(task_name="attachments"))
+
+    moved_sha, moved = _original(tmp_path, "aaa_moved.txt")
+    _store_blob(db, local, tmp_path, moved_sha, moved)
+    db.add(models.Attachment(
+        task_id=task.id, filename="moved.txt", filepath=blobs.relative_path(moved_sha),
+        sha256=moved_sha,
+    ))
+    # still the file of an attachment that was never repointed
+    pinned_sha, pinned = _original(tmp_path, "bbb_pinned.txt")
+    _store_blob(db, local, tmp_path, pinned_sha, pinned)
+    db.add(models.Attachment(task_id=task.id, filename="pinned.txt", filepath="bbb_pinned.txt"))
+    # content that is in no blob
+    _original(tmp_path, "ccc_unstored.txt")
+    _original(tmp_path, ".upload-in-progress")
+    db.commit()
+
+    assert blobs.purge_originals(db, local, str(tmp_path), dry_run=True) == (1, 64)
+    assert (tmp_path / "aaa_moved.txt").exists()
+
+    assert blobs.purge_originals(db, local, str(tmp_path)) == (1, 64)
+    left = {entry.name for entry in os.scandir(tmp_path) if entry.is_file()}
+    assert left == {"bbb_pinned.txt", "ccc_unstored.txt", ".upload-in-progress"}
+    assert local.exists(blobs.relative_path(moved_sha))
@@ -0,0 +1,37 @@
+import json
+import uuid
+
+import pytest
+
+from app import models, search
+
+
+def _import(client, name: str, content: bytes) -> list[dict]:
+    r = client.post("/tasks:import", files={"file": (name, content)})
+    assert r.status_code == 200
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_imported_tasks_are_searchable(admin, db):
+    word = "zq" + uuid.uuid4().hex[:10]
+    lines = b"\n".join(
+        json.dumps({"task_name": f"{word} {i}", "priority": "High"}).encode() for i in range(5)
+    )
+    progress = _import(admin, "tasks.ndjson", lines + b"\n{not json}\n")
+
+    assert progress[-1] == {"done": True, "processed": 6, "imported": 5, "failed": 1}
+    found = db.query(models.Task).filter(search.match_clause(db, word)).all()
+    assert sorted(t.task_name for t in found) == [f"{word} {i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("name, content", [
+    ("tasks.csv", b"task_name\nfirst\n\xff\xfe not utf-8\n"),
+    ("tasks.ndjson", b'{"task_name": "first"}\n\xff\xfe not utf-8\n'),
+])
+def test_undecodable_upload_still_finishes(admin, name, content):
+    progress = _import(admin, name, content)
+
+    errors = [e for p in progress for e in p.get("errors", [])]
+    assert any("unreadable input" in e["error"] for e in errors)
+    assert progress[-1]["done"] is True
+    assert progress[-1]["failed"] >= 1
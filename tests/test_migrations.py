@@ -0,0 +1,61 @@
+import importlib
+
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations
+
+initial = importlib.import_module("app.migrations.0000_initial_schema")
+
+
+def _schema(engine) -> dict:
+    found = inspect(engine)
+    return {
+        table: (
+            [(c["name"], str(c["type"]), c["nullable"]) for c in found.get_columns(table)],
+            found.get_pk_constraint(table)["constrained_columns"],
+            sorted((i["name"], tuple(i["column_names"]), bool(i["unique"])) for i in found.get_indexes(table)),
+            sorted((tuple(f["constrained_columns"]), f["referred_table"]) for f in found.get_foreign_keys(table)),
+        )
+        for table in found.get_table_names()
+        if table != "schema_migrations" and not table.startswith("task_search_")
+    }
+
+
+def test_initial_schema_is_the_baseline():
+    assert sorted(initial.metadata.tables) == ["attachments", "comments", "tasks", "users"]
+
+
+def test_new_database_matches_an_upgraded_one(tmp_path):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations.upgrade(fresh)
+
+    # a database from before schema_migrations existed: the baseline tables
+    # and some data, then its first migrate replays every script
+    existing = create_engine(f"sqlite:///{tmp_path / 'existing.db'}")
+    with existing.begin() as conn:
+        initial.upgrade(conn)
+        conn.execute(text(
+            "INSERT INTO tasks (task_name, status, priority, description) "
+            "VALUES ('old task', 'Code Review', 'High', 'from before')"
+        ))
+    migrations.upgrade(existing)
+
+    assert _schema(existing) == _schema(fresh)
+    with existing.connect() as conn:
+        row = conn.execute(text("SELECT priority_rank, status_rank FROM tasks")).one()
+        assert None not in row
+        hits = conn.execute(text("SELECT rowid FROM task_search WHERE task_search MATCH 'before'"))
+        assert len(hits.all()) == 1
+    fresh.dispose()
+    existing.dispose()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'twice.db'}")
+    migrations.upgrade(engine)
+    before = _schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE schema_migrations"))
+    migrations.upgrade(engine)
+    assert _schema(engine) == before
+    engine.dispose()
@@ -0,0 +1,70 @@
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import make_url
+
+from app import replicas
+from app.database import settings
+
+
+def _clear_caches():
+    for cached in (replicas.replica_urls, replicas._replica_sessions, replicas._async_replica_sessions):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def two_replicas(admin, tmp_path, monkeypatch):
+    """
+    Two copies of the test database as replicas, each holding a task the
+    primary lacks (same id, different name). Returns that task's id.
+    """
+    primary = sqlite3.connect(make_url(settings.DATABASE_URL).database)
+    task_id = primary.execute("SELECT COALESCE(MAX(id), 0) + 1000 FROM tasks").fetchone()[0]
+    urls = []
+    for i in range(2):
+        path = tmp_path / f"replica{i}.db"
+        with sqlite3.connect(path) as copy:
+            primary.backup(copy)
+            copy.execute(
+                "INSERT INTO tasks (id, task_name, status, priority) "
+                "VALUES (?, ?, 'Considered', 'Medium')",
+                (task_id, f"replica{i}"),
+            )
+        copy.close()
+        urls.append(f"sqlite:///{path}")
+    primary.close()
+
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ",".join(urls))
+    _clear_caches()
+    yield task_id
+    _clear_caches()
+
+
+def _read(client, task_id) -> str | None:
+    """Name of the task as the database serving the read has it (None on the primary)."""
+    r = client.get(f"/tasks/{task_id}")
+    return r.json()["task_name"] if r.status_code == 200 else None
+
+
+def test_reads_rotate_over_replicas(admin, two_replicas):
+    seen = [_read(admin, two_replicas) for _ in range(4)]
+    assert sorted(seen[:2]) == ["replica0", "replica1"]
+    assert seen[2:] == seen[:2]
+
+
+def test_write_pins_reads_to_primary(admin, two_replicas):
+    assert admin.post("/tasks", json={"task_name": "a write"}).status_code == 201
+    assert admin.cookies.get(replicas.PRIMARY_COOKIE)
+    assert _read(admin, two_replicas) is None
+    assert _read(admin, two_replicas) is None
+
+
+@pytest.mark.parametrize("forged", [
+    str(int(time.time() * 1000) + 10**9),  # unsigned
+    f"{int(time.time() * 1000) + 10**9}.{'0' * 32}",  # bad signature
+    replicas._primary_cookie(time.time() - 1),  # signed, expired
+], ids=["unsigned", "bad-signature", "expired"])
+def test_forged_or_expired_cookie_does_not_pin(admin, two_replicas, forged):
+    admin.cookies.set(replicas.PRIMARY_COOKIE, forged)
+    assert _read(admin, two_replicas) in ("replica0", "replica1")
@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from app.revocation import _RESCAN_IDS, RevocationList
+
+
+def _expiry():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+def test_own_revocations_advance_the_sync_mark(db):
+    revoked = RevocationList(capacity=10_000, sync_seconds=0)
+    for _ in range(3 * _RESCAN_IDS):
+        revoked.revoke(db, uuid.uuid4().hex, _expiry())
+    highest = db.query(models.RevokedToken.id).order_by(models.RevokedToken.id.desc()).first()[0]
+
+    revoked._load(db)
+    assert revoked._last_id == highest
+    # later syncs read only the trailing window, not every unexpired row
+    assert revoked._load(db) <= _RESCAN_IDS
+
+
+def test_row_committed_below_the_mark_is_picked_up(db):
+    revoked = RevocationList(capacity=10_000, sync_seconds=0)
+    top = (db.query(models.RevokedToken.id).order_by(models.RevokedToken.id.desc()).first() or (0,))[0]
+
+    # another process commits id top+10 first, then the transaction holding top+5
+    db.add(models.RevokedToken(id=top + 10, jti=uuid.uuid4().hex, expires_at=_expiry()))
+    db.commit()
+    revoked._load(db)
+    assert revoked._last_id == top + 10
+
+    late = uuid.uuid4().hex
+    db.add(models.RevokedToken(id=top + 5, jti=late, expires_at=_expiry()))
+    db.commit()
+    assert revoked.is_revoked(db, late)
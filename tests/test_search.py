@@ -0,0 +1,110 @@
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app import crud, migrations, models, schemas, search
+
+
+@pytest.fixture(params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgres)])
+def search_db(request, db):
+    """A session on each supported dialect: the test database, and Postgres when configured."""
+    if request.param == "sqlite":
+        yield db
+        return
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("set TEST_POSTGRES_URL to run against Postgres")
+    engine = create_engine(url)
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _word() -> str:
+    """A word no other task contains."""
+    return "zq" + uuid.uuid4().hex[:10]
+
+
+def _task(db, **fields) -> models.Task:
+    return crud.create_task(db, schemas.TaskCreate(task_name=fields.pop("task_name", "task"), **fields))
+
+
+def _matching(db, q: str) -> set[int]:
+    return {t.id for t in db.query(models.Task).filter(search.match_clause(db, q))}
+
+
+def test_match_clause(search_db):
+    word = _word()
+    named = _task(search_db, task_name=f"fix {word} handling")
+    described = _task(search_db, description=f"see {word}")
+    other = _task(search_db, task_name="unrelated")
+
+    assert _matching(search_db, word) == {named.id, described.id}
+    # prefix matching, every word must match
+    assert _matching(search_db, word[:8]) >= {named.id, described.id}
+    assert _matching(search_db, f"{word} handling") == {named.id}
+    assert other.id not in _matching(search_db, word)
+    assert search.match_clause(search_db, "  -- ") is None
+
+
+def test_name_outranks_description_outranks_comments(search_db):
+    word = _word()
+    commented = _task(search_db)
+    crud.create_comment_for_task(search_db, commented.id, schemas.CommentCreate(text=word))
+    described = _task(search_db, description=word)
+    named = _task(search_db, task_name=word)
+
+    hits = search.search_tasks(search_db, word)
+    assert [task.id for task, _ in hits] == [named.id, described.id, commented.id]
+
+
+def test_index_follows_writes(search_db):
+    old, new = _word(), _word()
+    task = _task(search_db, task_name=old)
+
+    crud.update_task(search_db, task.id, schemas.TaskUpdate(task_name=new))
+    assert _matching(search_db, old) == set()
+    assert _matching(search_db, new) == {task.id}
+
+    comment = _word()
+    crud.create_comment_for_task(search_db, task.id, schemas.CommentCreate(text=comment))
+    assert _matching(search_db, comment) == {task.id}
+
+    crud.delete_task(search_db, task.id)
+    assert _matching(search_db, new) == set()
+
+
+def test_backfill_indexes_only_missing_tasks(search_db):
+    word = _word()
+    indexed = _task(search_db, task_name=word)
+    # rows written behind crud's back, as before the index existed
+    task_id = search_db.execute(
+        insert(models.Task).values(task_name=word, status="Considered", priority="Medium")
+        .returning(models.Task.id)
+    ).scalar_one()
+    search_db.execute(
+        insert(models.Comment).values(task_id=task_id, text=f"{word} comment")
+    )
+    search_db.commit()
+    assert _matching(search_db, word) == {indexed.id}
+
+    with search_db.get_bind().begin() as conn:
+        assert search.backfill(conn) >= 1
+        assert search.backfill(conn) == 0
+    assert _matching(search_db, word) == {indexed.id, task_id}
+    assert _matching(search_db, "comment " + word) == {task_id}
+
+
+def test_unsupported_database_fails_at_install():
+    class Other:
+        dialect = type("Dialect", (), {"name": "mysql"})()
+
+        def execute(self, stmt):
+            raise AssertionError("no DDL should run")
+
+    with pytest.raises(RuntimeError, match="PostgreSQL or SQLite"):
+        search.install(Other())
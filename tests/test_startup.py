@@ -0,0 +1,8 @@
+from app import startup_profile
+
+
+def test_boot_is_within_target_and_auth_loads_lazily():
+    report, _ = startup_profile.profile()
+
+    assert report["eager_auth_modules"] == []
+    assert report["total_ms"] < startup_profile.TARGET_MS, report["phases_ms"]
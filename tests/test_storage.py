@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from app import storage
+
+
+def test_incomplete_backend_fails_when_built():
+    class NoList(storage.Storage):
+        def put(self, tmp_path, key): ...
+        def exists(self, key): ...
+        def iter_chunks(self, key): ...
+        def delete(self, key): ...
+
+    with pytest.raises(TypeError, match="list"):
+        NoList()
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """An S3Storage with prefix "tb/" on a moto bucket shared with other data."""
+    moto = pytest.importorskip("moto")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        backend = storage.S3Storage("bucket", prefix="tb/", region="us-east-1")
+        backend.client.create_bucket(Bucket="bucket")
+        backend.client.put_object(Bucket="bucket", Key="not-ours/file", Body=b"other")
+        yield backend
+
+
+def _tmp(tmp_path, content: bytes) -> str:
+    path = tmp_path / f"upload-{len(list(tmp_path.iterdir()))}"
+    path.write_bytes(content)
+    return str(path)
+
+
+def _objects(backend) -> set[str]:
+    listed = backend.client.list_objects_v2(Bucket="bucket")
+    return {obj["Key"] for obj in listed.get("Contents", [])}
+
+
+def test_s3_put_exists_and_read(s3, tmp_path):
+    tmp = _tmp(tmp_path, b"hello " * 1000)
+    s3.put(tmp, "blobs/ab/abc")
+
+    assert not os.path.exists(tmp)
+    assert s3.exists("blobs/ab/abc")
+    assert not s3.exists("blobs/ab/missing")
+    assert "tb/blobs/ab/abc" in _objects(s3)
+    assert b"".join(s3.iter_chunks("blobs/ab/abc")) == b"hello " * 1000
+
+
+def test_s3_put_skips_existing_key(s3, tmp_path):
+    s3.put(_tmp(tmp_path, b"first"), "blobs/ab/abc")
+    second = _tmp(tmp_path, b"second")
+    s3.put(second, "blobs/ab/abc")
+
+    assert b"".join(s3.iter_chunks("blobs/ab/abc")) == b"first"
+    assert not os.path.exists(second)
+
+
+def test_s3_list_and_delete(s3, tmp_path):
+    s3.put(_tmp(tmp_path, b"a"), "blobs/aa/one")
+    s3.put(_tmp(tmp_path, b"bb"), "blobs/bb/two")
+    s3.put(_tmp(tmp_path, b"ccc"), "thumbs/cc/three/160.webp")
+
+    listed = {key: size for key, size, _ in s3.list("blobs/")}
+    assert listed == {"blobs/aa/one": 1, "blobs/bb/two": 2}
+
+    s3.delete("blobs/aa/one")
+    s3.delete("blobs/aa/one")  # already gone: no error
+    assert [key for key, _, _ in s3.list("blobs/")] == ["blobs/bb/two"]
+
+
+def test_s3_presigned_url(s3, tmp_path):
+    from urllib.parse import parse_qs, urlsplit
+
+    s3.put(_tmp(tmp_path, b"a"), "blobs/aa/one")
+    url = urlsplit(s3.presigned_url("blobs/aa/one", "image/png", 'inline; filename="a.png"'))
+    query = parse_qs(url.query)
+
+    assert url.path.endswith("/tb/blobs/aa/one")
+    assert query["X-Amz-Expires"] == ["300"]
+    assert query["response-content-type"] == ["image/png"]
+    assert query["response-content-disposition"] == ['inline; filename="a.png"']
+
+
+def test_gc_sweeps_only_its_prefix(s3, db, tmp_path):
+    from app import blobs
+
+    s3.put(_tmp(tmp_path, b"orphan"), "blobs/ff/" + "f" * 64)
+    s3.put(_tmp(tmp_path, b"note"), "notes/keep.txt")
+
+    # a negative grace makes the files just written count as old
+    blobs.collect_garbage(db, s3, str(tmp_path), grace_seconds=-60)
+
+    assert _objects(s3) == {"not-ours/file", "tb/notes/keep.txt"}
+
+
+def test_gc_refuses_s3_without_prefix(s3, monkeypatch):
+    from app import cli
+    from app.database import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(settings, "S3_BUCKET", "bucket")
+    monkeypatch.setattr(settings, "S3_PREFIX", "")
+    storage.get_storage.cache_clear()
+    try:
+        with pytest.raises(SystemExit) as stopped:
+            cli.main(["gc-blobs", "--grace-seconds", "-60"])
+    finally:
+        storage.get_storage.cache_clear()
+
+    assert stopped.value.code == 1
+    assert "not-ours/file" in _objects(s3)
+
+
+def test_copy_blobs_into_bucket(s3, db, tmp_path):
+    import hashlib
+
+    from app import blobs
+
+    local = storage.LocalStorage(str(tmp_path / "uploads"))
+    contents = [os.urandom(100), os.urandom(200)]
+    for content in contents:
+        sha = hashlib.sha256(content).hexdigest()
+        blobs.acquire(db, sha, len(content))
+        local.put(_tmp(tmp_path, content), blobs.relative_path(sha))
+    blobs.acquire(db, "0" * 64, 10)  # row whose file is gone everywhere
+    db.commit()
+
+    copied, _ = blobs.copy_all(db, local, s3, str(tmp_path))
+    assert copied == 2
+    for content in contents:
+        key = blobs.relative_path(hashlib.sha256(content).hexdigest())
+        assert b"".join(s3.iter_chunks(key)) == content
+
+    # a second run (after the switch) only copies what is still missing
+    assert blobs.copy_all(db, local, s3, str(tmp_path))[0] == 0